@@ -0,0 +1,215 @@
+"""
+Benchmarks for the physics, field and rendering hot paths.
+
+Times each hot path at several body counts, writes the results with machine metadata to JSON and
+compares them against a stored baseline. Any benchmark slower than the baseline by more than the
+tolerance is reported and the script exits with status 1; without a baseline to compare against it
+exits with status 2. Physics runs on exact direct summation up to DIRECT_MAX_BODIES bodies and on
+Barnes–Hut above that (or on the engine given with --engine).
+
+Run from the project root:
+    python benchmarks/run_benchmarks.py                      # compare against benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline      # record a new baseline on this machine
+    python benchmarks/run_benchmarks.py --sizes 10 100 1000  # quicker subset
+    python benchmarks/run_benchmarks.py --sizes 1000000      # add a million-body run (Barnes–Hut)
+"""
+import os
+import sys
+
+# Rendering benchmarks draw onto off-screen surfaces through SDL's dummy video driver
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import platform
+import time
+from types import SimpleNamespace
+import numpy as np
+import pygame
+from core.scene import Scene, FORCE_ENGINES
+from core import kernels
+from core.splat import splat_points
+from setup.config import SIDEBAR_WIDTH, WINDOW_WIDTH, WINDOW_HEIGHT
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, "results", "latest.json")
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+# Largest body count benchmarked with the O(n²) direct engine when the engine is "auto"
+DIRECT_MAX_BODIES = 10000
+
+# Repeat each measurement until this much time has been spent (or MAX_REPEATS is reached)
+MIN_TOTAL_SECONDS = 0.5
+MAX_REPEATS = 20
+
+
+def machine_metadata():
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pygame": pygame.version.ver,
+        "numba": kernels.numba.__version__ if kernels.COMPILED else None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def engine_for(n, engine="auto"):
+    """Force engine benchmarked at n bodies: `engine`, or for "auto" direct summation up to DIRECT_MAX_BODIES."""
+    if engine != "auto":
+        return engine
+    return "direct" if n <= DIRECT_MAX_BODIES else "barnes_hut"
+
+
+def build_scene(n, seed=0, engine="direct"):
+    """A scene of n bodies scattered over the visible simulation area."""
+    scene = Scene()
+    scene.set_force_engine(engine)
+    camera = scene.camera
+    rng = np.random.default_rng(seed)
+    left, top = camera.screen_to_world(SIDEBAR_WIDTH, 0)
+    right, bottom = camera.screen_to_world(WINDOW_WIDTH - SIDEBAR_WIDTH, WINDOW_HEIGHT)
+    scene.objects.extend(
+        np.arange(n),
+        x=rng.uniform(left, right, n),
+        y=rng.uniform(top, bottom, n),
+        vx=rng.normal(0, 100, n),
+        vy=rng.normal(0, 100, n),
+        mass=rng.uniform(1e18, 1e22, n),
+        radius=rng.uniform(1e4, 1e5, n),
+        color=(200, 50, 50),
+    )
+    scene.object_id_counter = n
+    return scene
+
+
+def time_call(func):
+    """Minimum and median wall time of repeated calls."""
+    samples = []
+    spent = 0.0
+    while spent < MIN_TOTAL_SECONDS and len(samples) < MAX_REPEATS:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        spent += elapsed
+    return {"min": min(samples), "median": float(np.median(samples)), "repeats": len(samples)}
+
+
+def benchmark_cases(scene, surface, font):
+    sim = SimpleNamespace(elapsed_time=0.0, speed_multiplier=1.0)
+    field = scene.vector_field.generate()
+
+    def generate_field():
+        # Cold generate: the cache would otherwise turn every repeat into a no-op
+        scene.vector_field.invalidate()
+        scene.vector_field.generate()
+
+    # Every body as a one-pixel splat; at small n these are a few pixels spread across the whole view
+    splat_x, splat_y = scene.camera.world_to_screen(scene.objects.x, scene.objects.y)
+    splat_x, splat_y = splat_x.astype(np.int64), splat_y.astype(np.int64)
+
+    def draw_objects():
+        # Advance the clock like a 60 FPS frame so trails are trimmed as in the app
+        sim.elapsed_time += 1 / 60
+        scene.draw_objects(surface, font, sim)
+
+    return {
+        "update_object_velocities": lambda: scene.update_object_velocities(1.0),
+        "update_object_positions": lambda: scene.update_object_positions(1.0),
+        "vector_field_generate": generate_field,
+        "vector_field_cached": scene.vector_field.generate,
+        "draw_vector_field": lambda: scene.draw_vector_field(surface, *field),
+        "draw_objects": draw_objects,
+        "splat_points": lambda: splat_points(surface, splat_x, splat_y, scene.objects.color, "additive", scene.heatmap_lut),
+    }
+
+
+def run_benchmarks(sizes, only=None, engine="auto"):
+    pygame.init()
+    surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    font = pygame.font.SysFont(None, 20)
+
+    results = {}
+    for n in sizes:
+        scene_engine = engine_for(n, engine)
+        scene = build_scene(n, engine=scene_engine)
+        for name, func in benchmark_cases(scene, surface, font).items():
+            if only and name not in only:
+                continue
+            timing = time_call(func)
+            timing["engine"] = scene_engine
+            results[f"{name}@{n}"] = timing
+            print(f"{name:>26} n={n:<7} min {timing['min'] * 1e3:10.3f} ms  "
+                  f"median {timing['median'] * 1e3:10.3f} ms  ({timing['repeats']} runs, {scene_engine})")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Benchmarks whose minimum time exceeds the baseline by more than `tolerance` (a fraction)."""
+    regressions = []
+    for key, timing in results.items():
+        reference = baseline.get("results", {}).get(key)
+        # Timings on different solvers aren't comparable
+        if reference is None or reference.get("engine", timing["engine"]) != timing["engine"]:
+            continue
+        ratio = timing["min"] / reference["min"] if reference["min"] > 0 else float("inf")
+        if ratio > 1 + tolerance:
+            regressions.append((key, reference["min"], timing["min"], ratio))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulator's hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="body counts to benchmark")
+    parser.add_argument("--only", nargs="+", help="run only these benchmarks")
+    parser.add_argument("--engine", default="auto", choices=["auto", *FORCE_ENGINES],
+                        help=f"force engine for the physics benchmarks (default auto: direct up to {DIRECT_MAX_BODIES} bodies, then barnes_hut)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the JSON results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing (default 0.25 = 25%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = {"machine": machine_metadata(), "results": run_benchmarks(args.sizes, args.only, args.engine)}
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        # Passing without anything to compare against would hide every regression
+        print(f"ERROR: no baseline at {args.baseline}; run with --save-baseline to record one on this machine.")
+        return 2
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("machine", {}).get("platform") != report["machine"]["platform"]:
+        print("Warning: baseline was recorded on a different machine; timings may not be comparable.")
+
+    regressions = compare(report["results"], baseline, args.tolerance)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSION: {len(regressions)} benchmark(s) slower than baseline by more than {args.tolerance:.0%}")
+        for key, before, after, ratio in regressions:
+            print(f"  {key:>36}: {before * 1e3:.3f} ms -> {after * 1e3:.3f} ms ({ratio:.2f}x)")
+        return 1
+
+    print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+import numpy as np
+from core.force_engines import ForceEngine
+from setup.config import G, BARNES_HUT_THETA, BARNES_HUT_LEAF_SIZE, BARNES_HUT_BATCH_SIZE
+
+# Quadrant offsets of the four children, in the order they are stored (x bit, then y bit)
+CHILD_X_SIGNS = np.array([-1.0, 1.0, -1.0, 1.0])
+CHILD_Y_SIGNS = np.array([-1.0, -1.0, 1.0, 1.0])
+MAX_DEPTH = 48
+
+
+def _segment_positions(starts, counts):
+    """Concatenate the ranges [start, start + count) into one index array."""
+    total = counts.sum()
+    offsets = np.cumsum(counts) - counts
+    return np.arange(total) - np.repeat(offsets, counts) + np.repeat(starts, counts)
+
+
+class QuadTree:
+    """
+    Array-backed quadtree over a set of bodies.
+
+    Nodes are stored level by level in flat arrays; the four children of a node are contiguous starting
+    at `first_child[node]` (-1 for leaves). Bodies are reordered in `order` so that every node owns the
+    contiguous range `order[start:start + count]`. Each node carries its total mass, centre of mass and
+    mass-weighted mean radius, which is used to soften cell interactions the same way the direct kernel
+    clips pair distances at the sum of radii.
+    """
+
+    def __init__(self, x, y, masses, radii, leaf_size=BARNES_HUT_LEAF_SIZE):
+        self.x = x
+        self.y = y
+        self.masses = masses
+        self.radii = radii
+        self.leaf_size = max(1, int(leaf_size))
+        self._build()
+        self._compute_moments()
+
+    def _build(self):
+        n = self.x.shape[0]
+        self.order = np.arange(n)
+
+        if n:
+            xmin, xmax = self.x.min(), self.x.max()
+            ymin, ymax = self.y.min(), self.y.max()
+        else:
+            xmin = xmax = ymin = ymax = 0.0
+        half = max(xmax - xmin, ymax - ymin) / 2
+        # Pad slightly so bodies on the boundary fall strictly inside the root
+        half = half * (1 + 1e-9) if half > 0 else 1.0
+
+        level_cx = np.array([(xmin + xmax) / 2])
+        level_cy = np.array([(ymin + ymax) / 2])
+        level_half = np.array([half])
+        level_start = np.array([0])
+        level_count = np.array([n])
+
+        cx, cy, halves, starts, counts, first_child = [], [], [], [], [], []
+        self.level_offsets = [0]
+        total_nodes = 1
+        depth = 0
+
+        while True:
+            cx.append(level_cx)
+            cy.append(level_cy)
+            halves.append(level_half)
+            starts.append(level_start)
+            counts.append(level_count)
+            level_first_child = np.full(level_cx.shape[0], -1)
+            first_child.append(level_first_child)
+
+            split = np.nonzero(level_count > self.leaf_size)[0] if depth < MAX_DEPTH else np.zeros(0, dtype=int)
+            if split.size == 0:
+                break
+
+            seg_start = level_start[split]
+            seg_count = level_count[split]
+            positions = _segment_positions(seg_start, seg_count)
+            node_of = np.repeat(np.arange(split.size), seg_count)
+            bodies = self.order[positions]
+
+            quadrant = ((self.x[bodies] >= level_cx[split][node_of]).astype(np.int64)
+                        + 2 * (self.y[bodies] >= level_cy[split][node_of]))
+            key = node_of * 4 + quadrant
+            # Stable sort keeps node segments in place and groups each segment by quadrant
+            self.order[positions] = bodies[np.argsort(key, kind="stable")]
+
+            child_count = np.bincount(key, minlength=4 * split.size).reshape(-1, 4)
+            child_start = seg_start[:, np.newaxis] + np.cumsum(child_count, axis=1) - child_count
+            child_half = level_half[split] / 2
+
+            level_first_child[split] = total_nodes + 4 * np.arange(split.size)
+            total_nodes += 4 * split.size
+            self.level_offsets.append(total_nodes - 4 * split.size)
+
+            level_cx = (level_cx[split][:, np.newaxis] + CHILD_X_SIGNS * child_half[:, np.newaxis]).ravel()
+            level_cy = (level_cy[split][:, np.newaxis] + CHILD_Y_SIGNS * child_half[:, np.newaxis]).ravel()
+            level_half = np.repeat(child_half, 4)
+            level_start = child_start.ravel()
+            level_count = child_count.ravel()
+            depth += 1
+
+        self.cx = np.concatenate(cx)
+        self.cy = np.concatenate(cy)
+        self.half = np.concatenate(halves)
+        self.start = np.concatenate(starts)
+        self.count = np.concatenate(counts)
+        self.first_child = np.concatenate(first_child)
+
+    def _compute_moments(self):
+        node_count = self.cx.shape[0]
+        mass = np.zeros(node_count)
+        mass_x = np.zeros(node_count)
+        mass_y = np.zeros(node_count)
+        mass_r = np.zeros(node_count)
+
+        # Leaves partition the ordered bodies, so their sums are exact segment reductions
+        leaves = np.nonzero((self.first_child < 0) & (self.count > 0))[0]
+        if leaves.size:
+            leaves = leaves[np.argsort(self.start[leaves])]
+            m = self.masses[self.order]
+            seg = self.start[leaves]
+            mass[leaves] = np.add.reduceat(m, seg)
+            mass_x[leaves] = np.add.reduceat(m * self.x[self.order], seg)
+            mass_y[leaves] = np.add.reduceat(m * self.y[self.order], seg)
+            mass_r[leaves] = np.add.reduceat(m * self.radii[self.order], seg)
+
+        # Accumulate internal nodes bottom-up, one level at a time
+        bounds = self.level_offsets + [node_count]
+        for level in range(len(self.level_offsets) - 1, -1, -1):
+            nodes = np.arange(bounds[level], bounds[level + 1])
+            nodes = nodes[self.first_child[nodes] >= 0]
+            if nodes.size == 0:
+                continue
+            children = self.first_child[nodes][:, np.newaxis] + np.arange(4)
+            for total in (mass, mass_x, mass_y, mass_r):
+                total[nodes] = total[children].sum(axis=1)
+
+        occupied = mass > 0
+        self.mass = mass
+        self.com_x = np.divide(mass_x, mass, out=self.cx.copy(), where=occupied)
+        self.com_y = np.divide(mass_y, mass, out=self.cy.copy(), where=occupied)
+        self.mean_radius = np.divide(mass_r, mass, out=np.zeros(node_count), where=occupied)
+
+    def accelerations(self, px, py, pr, exclude=None, theta=BARNES_HUT_THETA, batch_size=BARNES_HUT_BATCH_SIZE):
+        """
+        Accelerations at points (px, py) with radii pr.
+
+        A cell is treated as a point mass when its width is below theta times the distance to its
+        centre of mass and the point lies outside it; otherwise it is opened. Leaves are summed exactly.
+        `exclude` optionally gives, per point, a body index to skip (the body itself).
+        """
+        m = px.shape[0]
+        ax = np.zeros(m)
+        ay = np.zeros(m)
+        if m == 0 or self.x.shape[0] == 0:
+            return ax, ay
+
+        for b0 in range(0, m, batch_size):
+            b1 = min(b0 + batch_size, m)
+            size = b1 - b0
+            targets = np.arange(b0, b1)
+            nodes = np.zeros(size, dtype=np.int64)
+
+            while targets.size:
+                occupied = self.mass[nodes] > 0
+                targets, nodes = targets[occupied], nodes[occupied]
+
+                tx, ty = px[targets], py[targets]
+                rx = self.com_x[nodes] - tx
+                ry = self.com_y[nodes] - ty
+                distances = np.sqrt(rx * rx + ry * ry)
+
+                leaf = self.first_child[nodes] < 0
+                outside = ((np.abs(tx - self.cx[nodes]) > self.half[nodes])
+                           | (np.abs(ty - self.cy[nodes]) > self.half[nodes]))
+                far = ~leaf & outside & (2 * self.half[nodes] < theta * distances)
+
+                # Far cells: monopole approximation with radius-softened distance
+                if far.any():
+                    ft = targets[far]
+                    d = distances[far]
+                    clipped = np.maximum(d, pr[ft] + self.mean_radius[nodes[far]])
+                    factors = G * self.mass[nodes[far]] / (clipped * clipped * d)
+                    ax[b0:b1] += np.bincount(ft - b0, factors * rx[far], minlength=size)
+                    ay[b0:b1] += np.bincount(ft - b0, factors * ry[far], minlength=size)
+
+                # Leaves: exact pairwise sums against every body they hold
+                if leaf.any():
+                    lt, ln = targets[leaf], nodes[leaf]
+                    counts = self.count[ln]
+                    pair_targets = np.repeat(lt, counts)
+                    pair_bodies = self.order[_segment_positions(self.start[ln], counts)]
+                    if exclude is not None:
+                        keep = pair_bodies != exclude[pair_targets]
+                        pair_targets, pair_bodies = pair_targets[keep], pair_bodies[keep]
+                    rx_p = self.x[pair_bodies] - px[pair_targets]
+                    ry_p = self.y[pair_bodies] - py[pair_targets]
+                    d = np.sqrt(rx_p * rx_p + ry_p * ry_p)
+                    clipped = np.maximum(d, pr[pair_targets] + self.radii[pair_bodies])
+                    denominator = clipped * clipped * d
+                    factors = np.divide(G * self.masses[pair_bodies], denominator,
+                                        out=np.zeros_like(denominator), where=d > 0)
+                    ax[b0:b1] += np.bincount(pair_targets - b0, factors * rx_p, minlength=size)
+                    ay[b0:b1] += np.bincount(pair_targets - b0, factors * ry_p, minlength=size)
+
+                # Everything else is opened into its four children
+                opened = ~leaf & ~far
+                targets = np.repeat(targets[opened], 4)
+                nodes = (self.first_child[nodes[opened]][:, np.newaxis] + np.arange(4)).ravel()
+
+        return ax, ay
+
+
+class BarnesHutEngine(ForceEngine):
+    """
+    O(n log n) Barnes–Hut approximation with opening angle theta.
+
+    The tree is rebuilt from all bodies on every call, including calls for a subset of targets. Only the
+    targets walk it, and the walk is most of the cost (the build is about 1% of a full evaluation).
+    """
+
+    name = "barnes_hut"
+    label = "Barnes-Hut"
+
+    def __init__(self, theta=BARNES_HUT_THETA, leaf_size=BARNES_HUT_LEAF_SIZE, batch_size=BARNES_HUT_BATCH_SIZE):
+        self.theta = theta
+        self.leaf_size = leaf_size
+        self.batch_size = max(1, int(batch_size))
+
+    def compute_accelerations(self, bodies, targets=None):
+        x, y, radii = bodies.x, bodies.y, bodies.radius
+        tree = QuadTree(x, y, bodies.mass, radii, self.leaf_size)
+        if targets is None:
+            targets = np.arange(x.shape[0])
+        return tree.accelerations(x[targets], y[targets], radii[targets], exclude=targets,
+                                  theta=self.theta, batch_size=self.batch_size)
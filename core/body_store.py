@@ -0,0 +1,248 @@
+import weakref
+import numpy as np
+
+# Column layout of the store: name -> (per-body shape, dtype)
+BODY_COLUMNS = {
+    "id": ((), np.int64),
+    "x": ((), np.float64),
+    "y": ((), np.float64),
+    "vx": ((), np.float64),
+    "vy": ((), np.float64),
+    "mass": ((), np.float64),
+    "radius": ((), np.float64),
+    "color": ((3,), np.uint8),
+}
+
+INITIAL_CAPACITY = 16
+
+
+def _column_property(column):
+    def getter(view):
+        value = view._store._columns[column][view._store.index_of(view.id)]
+        if column == "color":
+            return tuple(int(c) for c in value)
+        return value.item()
+
+    def setter(view, value):
+        store = view._store
+        store._columns[column][store.index_of(view.id)] = value
+        store.version += 1
+
+    return property(getter, setter)
+
+
+class BodyView:
+    """
+    Lightweight proxy for a single body held in a BodyStore.
+
+    Reads and writes of the physical attributes go straight through to the store's arrays, so UI code
+    can keep treating bodies as plain objects. Any other attribute (e.g. `shock_absorption`) is kept on
+    the view itself, so it lasts only as long as something holds on to the view.
+    """
+
+    def __init__(self, store, body_id):
+        self._store = store
+        self.id = body_id
+
+    x = _column_property("x")
+    y = _column_property("y")
+    vx = _column_property("vx")
+    vy = _column_property("vy")
+    mass = _column_property("mass")
+    radius = _column_property("radius")
+    color = _column_property("color")
+
+    @property
+    def name(self):
+        return self._store.names.get(self.id, "")
+
+    @name.setter
+    def name(self, value):
+        self._store.names[self.id] = value
+
+    @property
+    def index(self):
+        return self._store.index_of(self.id)
+
+    def __repr__(self):
+        return f"BodyView(id={self.id}, name={self.name!r})"
+
+
+class BodyStore:
+    """
+    Struct-of-arrays storage for simulation bodies.
+
+    Every column lives in one contiguous NumPy buffer with amortized (doubling) growth. Bodies are
+    appended in O(1) and deleted in O(1) by moving the last body into the freed slot, so the index of a
+    body may change on deletion; the id -> index map always tracks the current slot. Physics code works
+    on the column views (`store.x`, `store.vx`, ...) directly, while UI code iterates `BodyView` proxies.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.count = 0
+        self.capacity = max(1, capacity)
+        self._columns = {}
+        self._column_specs = {}
+        self._index_by_id = {}
+        # Views are cached weakly: the same body gives the same view while one is in use, without keeping
+        # a view alive for every body that was ever looked at
+        self._views = weakref.WeakValueDictionary()
+        self.names = {}
+        # Bumped on every structural change or external edit so caches can detect stale data
+        self.version = 0
+
+        for column, (shape, dtype) in BODY_COLUMNS.items():
+            self.register_column(column, shape, dtype)
+
+    def register_column(self, column, shape=(), dtype=np.float64, fill=0):
+        """Add an extra per-body column that grows and swap-removes together with the built-in ones."""
+        self._column_specs[column] = (tuple(shape), dtype, fill)
+        self._columns[column] = np.full((self.capacity, *shape), fill, dtype=dtype)
+
+    def column(self, column):
+        """Return the active slice of a column (a view, writes go to the store)."""
+        return self._columns[column][:self.count]
+
+    @property
+    def ids(self):
+        return self.column("id")
+
+    @property
+    def x(self):
+        return self.column("x")
+
+    @property
+    def y(self):
+        return self.column("y")
+
+    @property
+    def vx(self):
+        return self.column("vx")
+
+    @property
+    def vy(self):
+        return self.column("vy")
+
+    @property
+    def mass(self):
+        return self.column("mass")
+
+    @property
+    def radius(self):
+        return self.column("radius")
+
+    @property
+    def color(self):
+        return self.column("color")
+
+    def _grow(self, min_capacity):
+        new_capacity = self.capacity
+        while new_capacity < min_capacity:
+            new_capacity *= 2
+        for column, buffer in self._columns.items():
+            shape, dtype, fill = self._column_specs[column]
+            grown = np.full((new_capacity, *shape), fill, dtype=dtype)
+            grown[:self.count] = buffer[:self.count]
+            self._columns[column] = grown
+        self.capacity = new_capacity
+
+    def add(self, body_id, x=0.0, y=0.0, vx=0.0, vy=0.0, mass=1.0, radius=1.0, color=(200, 50, 50), name=""):
+        """Append a body and return its view."""
+        if body_id in self._index_by_id:
+            raise ValueError(f"Body id {body_id} already exists")
+        if self.count == self.capacity:
+            self._grow(self.count + 1)
+
+        i = self.count
+        for column, value in (("id", body_id), ("x", x), ("y", y), ("vx", vx), ("vy", vy),
+                              ("mass", mass), ("radius", radius), ("color", color)):
+            self._columns[column][i] = value
+        for column, (shape, dtype, fill) in self._column_specs.items():
+            if column not in BODY_COLUMNS:
+                self._columns[column][i] = fill
+
+        self._index_by_id[body_id] = i
+        if name:
+            self.names[body_id] = name
+        self.count += 1
+        self.version += 1
+
+        view = BodyView(self, body_id)
+        self._views[body_id] = view
+        return view
+
+    def extend(self, ids, x, y, vx, vy, mass, radius, color=(200, 50, 50)):
+        """Append many bodies at once from arrays (no per-body Python work besides the id map)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        k = ids.size
+        if k == 0:
+            return
+        if np.unique(ids).size != k or np.isin(ids, self.ids).any():
+            raise ValueError("Body ids must be unique")
+        if self.count + k > self.capacity:
+            self._grow(self.count + k)
+
+        start, end = self.count, self.count + k
+        for column, values in (("id", ids), ("x", x), ("y", y), ("vx", vx), ("vy", vy),
+                               ("mass", mass), ("radius", radius), ("color", color)):
+            self._columns[column][start:end] = values
+        for column, (shape, dtype, fill) in self._column_specs.items():
+            if column not in BODY_COLUMNS:
+                self._columns[column][start:end] = fill
+
+        self._index_by_id.update(zip(ids.tolist(), range(start, end)))
+        self.count = end
+        self.version += 1
+
+    def index_of(self, body_id):
+        return self._index_by_id[body_id]
+
+    def get(self, body_id):
+        """Return the view for a body id, or None if it is not in the store."""
+        if body_id not in self._index_by_id:
+            return None
+        view = self._views.get(body_id)
+        if view is None:
+            view = self._views[body_id] = BodyView(self, body_id)
+        return view
+
+    def remove_id(self, body_id):
+        """Delete a body by moving the last body into its slot."""
+        i = self._index_by_id.pop(body_id)
+        last = self.count - 1
+        if i != last:
+            for buffer in self._columns.values():
+                buffer[i] = buffer[last]
+            self._index_by_id[int(self._columns["id"][i])] = i
+        self.count = last
+        self.names.pop(body_id, None)
+        self._views.pop(body_id, None)
+        self.version += 1
+
+    def remove(self, view):
+        self.remove_id(view.id)
+
+    def clear(self):
+        self.count = 0
+        self._index_by_id.clear()
+        self._views.clear()
+        self.names.clear()
+        self.version += 1
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        # Snapshot the ids so callers may delete while iterating
+        for body_id in self.ids.tolist():
+            yield self.get(body_id)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("body index out of range")
+        return self.get(int(self._columns["id"][index]))
+
+    def __contains__(self, view):
+        return isinstance(view, BodyView) and view._store is self and view.id in self._index_by_id
@@ -1,3 +1,4 @@
+import numpy as np
 from setup.config import (WINDOW_WIDTH, WINDOW_HEIGHT)
 
 class Camera:
@@ -12,15 +13,29 @@ class Camera:
         return self.base_pixels_per_meter * self.zoom
 
     def world_to_screen(self, wx, wy):
+        """World to screen coordinates; scalars or NumPy arrays (transformed elementwise in one pass)."""
         sx = wx * self.pixels_per_meter + self.x_offset
         sy = wy * self.pixels_per_meter + self.y_offset
         return sx, sy
 
     def screen_to_world(self, sx, sy):
+        """Screen to world coordinates; scalars or NumPy arrays."""
         wx = (sx - self.x_offset) / self.pixels_per_meter
         wy = (sy - self.y_offset) / self.pixels_per_meter
         return wx, wy
 
+    def view_rect(self, width, height, margin_px=0):
+        """World-space (left, top, right, bottom) of a width x height screen, grown by margin_px on every side."""
+        left, top = self.screen_to_world(-margin_px, -margin_px)
+        right, bottom = self.screen_to_world(width + margin_px, height + margin_px)
+        return left, top, right, bottom
+
+    def in_view(self, wx, wy, radius, width, height, margin_px=0):
+        """Mask of circles whose bounding box overlaps the view rectangle (radii count as at least a pixel)."""
+        left, top, right, bottom = self.view_rect(width, height, margin_px)
+        radius = np.maximum(radius, 1 / self.pixels_per_meter)
+        return (wx + radius >= left) & (wx - radius <= right) & (wy + radius >= top) & (wy - radius <= bottom)
+
     def center_on(self, wx, wy):
         """Center the camera on a world coordinate."""
         self.x_offset = -wx * self.pixels_per_meter + (WINDOW_WIDTH // 2)
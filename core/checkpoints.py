@@ -0,0 +1,121 @@
+from bisect import bisect_right
+from setup.config import CHECKPOINT_INTERVAL_STEPS, CHECKPOINT_MEMORY_MB
+
+
+def _state_bytes(state):
+    arrays = list(state["columns"].values())
+    if state["accelerations"] is not None:
+        arrays.append(state["accelerations"])
+    integrator_state = state["integrator_state"] or {}
+    arrays.extend(value for value in integrator_state.values() if hasattr(value, "nbytes"))
+    return sum(array.nbytes for array in arrays)
+
+
+class CheckpointHistory:
+    """
+    In-memory checkpoints of the scene taken every `interval_steps` physics steps, for rewinding.
+
+    `before_step()` is called ahead of every physics step with the step's dt. Besides the periodic
+    checkpoints, one is taken whenever the bodies, solver or integrator were changed from outside the
+    physics (an edit, an added body, a new engine), and those steps are remembered as change points. To
+    rewind, the latest checkpoint at or before the target step is restored and the logged steps are
+    re-run from it, which reproduces the original run exactly, since re-running never crosses a change
+    point. Once the checkpoints exceed the memory budget, the one whose removal leaves the smallest gap
+    relative to its age is dropped (change-point checkpoints last), so the spacing between checkpoints
+    grows with age and a fixed budget covers an ever longer (logarithmically spaced) history. The oldest
+    and newest are always kept.
+    """
+
+    def __init__(self, interval_steps=CHECKPOINT_INTERVAL_STEPS, memory_mb=CHECKPOINT_MEMORY_MB):
+        self.interval_steps = max(1, int(interval_steps))
+        self.memory_budget = memory_mb * 2 ** 20
+        self.clear()
+
+    def clear(self):
+        # Number of physics steps taken so far; checkpoints are (step, elapsed time, state, bytes)
+        self.step = 0
+        self.checkpoints = []
+        self.memory_used = 0
+        self._changes = []
+        # Run-length log of step sizes: (first step, dt) whenever dt changes
+        self._dts = []
+        self._key = None
+
+    def _scene_key(self, scene):
+        return (scene.objects.version, scene.force_engine, scene.integrator)
+
+    def before_step(self, scene, elapsed_time, dt):
+        """Checkpoint the scene if due, and log the size of the step about to be taken."""
+        key = self._scene_key(scene)
+        changed = key != self._key
+        if changed and self._key is not None:
+            self._changes.append(self.step)
+        if changed or self.step % self.interval_steps == 0:
+            self._capture(scene, elapsed_time)
+        self._key = key
+
+        if not self._dts or self._dts[-1][1] != dt:
+            self._dts.append((self.step, dt))
+        self.step += 1
+
+    def _capture(self, scene, elapsed_time):
+        if self.checkpoints and self.checkpoints[-1][0] == self.step:
+            self.memory_used -= self.checkpoints.pop()[3]
+        state = scene.capture_state()
+        size = _state_bytes(state)
+        self.checkpoints.append((self.step, elapsed_time, state, size))
+        self.memory_used += size
+        self._thin()
+
+    def _thin(self):
+        checkpoints = self.checkpoints
+        while self.memory_used > self.memory_budget and len(checkpoints) > 2:
+            steps = [checkpoint[0] for checkpoint in checkpoints]
+            # Checkpoints at change points go last, since without them rewinds can't land before a change
+            changes = set(self._changes)
+            drop = min(range(1, len(steps) - 1),
+                       key=lambda i: (steps[i] in changes, (steps[i + 1] - steps[i - 1]) / (self.step - steps[i] + 1)))
+            self.memory_used -= checkpoints.pop(drop)[3]
+
+        # Step sizes and change points older than the oldest checkpoint can never be re-run
+        oldest = checkpoints[0][0]
+        self._changes = [change for change in self._changes if change > oldest]
+        first = max(bisect_right([start for start, _ in self._dts], oldest) - 1, 0)
+        del self._dts[:first]
+
+    def dt_at(self, step):
+        starts = [start for start, _ in self._dts]
+        return self._dts[bisect_right(starts, step) - 1][1]
+
+    def rewind(self, scene, target_step):
+        """
+        Put the scene back to how it was before physics step `target_step` (clamped to the recorded
+        history) and return (step, elapsed time) reached. Later checkpoints are discarded.
+        """
+        if not self.checkpoints:
+            return self.step, None
+        target_step = min(max(target_step, self.checkpoints[0][0]), self.step)
+        index = bisect_right([checkpoint[0] for checkpoint in self.checkpoints], target_step) - 1
+
+        # Re-running may not cross a change point; if its checkpoint was thinned away, stop at the next one
+        changes = [change for change in self._changes if self.checkpoints[index][0] < change <= target_step]
+        if changes:
+            index = bisect_right([checkpoint[0] for checkpoint in self.checkpoints], changes[-1] - 1)
+            target_step = self.checkpoints[index][0]
+
+        step, elapsed_time, state, _ = self.checkpoints[index]
+        scene.restore_state(state)
+        while step < target_step:
+            dt = self.dt_at(step)
+            elapsed_time += dt
+            scene.update(dt)
+            step += 1
+
+        for checkpoint in self.checkpoints[index + 1:]:
+            self.memory_used -= checkpoint[3]
+        del self.checkpoints[index + 1:]
+        self._changes = [change for change in self._changes if change <= step]
+        self._dts = [(start, dt) for start, dt in self._dts if start < step]
+        self.step = step
+        self._key = self._scene_key(scene)
+        return step, elapsed_time
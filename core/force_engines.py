@@ -0,0 +1,84 @@
+import numpy as np
+from core import kernels
+from setup.config import G, FORCE_TILE_SIZE
+
+
+class ForceEngine:
+    """
+    Interface for gravity solvers plugged into a Scene.
+
+    An engine turns the current body arrays into per-body accelerations. `targets` optionally restricts
+    the computation to a subset of body indices; sources are always all bodies.
+    """
+
+    name = "base"
+    label = "Base"
+
+    def compute_accelerations(self, bodies, targets=None):
+        """Return (ax, ay) arrays for `targets` (all bodies when None)."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the engine (called when the scene switches engines)."""
+        pass
+
+
+def direct_accelerations(x, y, masses, radii, tx, ty, tr, tile_size=FORCE_TILE_SIZE):
+    """
+    Pairwise Newtonian accelerations of target points due to all source bodies.
+
+    The pair distance used for the strength is clipped at the sum of both radii, while the direction
+    uses the true separation, and coincident points (distance 0) are skipped. Work is done in
+    tile_size x tile_size blocks so temporaries stay bounded regardless of body count; with the compiled
+    kernels available the whole sum runs as one fused loop instead.
+    """
+    if kernels.COMPILED:
+        return kernels.direct_accelerations(x, y, masses, radii, tx, ty, tr)
+
+    n_targets = tx.shape[0]
+    n_sources = x.shape[0]
+    ax = np.zeros(n_targets)
+    ay = np.zeros(n_targets)
+
+    for t0 in range(0, n_targets, tile_size):
+        t1 = min(t0 + tile_size, n_targets)
+        bx = tx[t0:t1, np.newaxis]
+        by = ty[t0:t1, np.newaxis]
+        br = tr[t0:t1, np.newaxis]
+
+        for s0 in range(0, n_sources, tile_size):
+            s1 = min(s0 + tile_size, n_sources)
+            rx = x[np.newaxis, s0:s1] - bx
+            ry = y[np.newaxis, s0:s1] - by
+            distances = np.sqrt(rx * rx + ry * ry)
+
+            # Clip distances to avoid extreme acceleration (at or below object radii)
+            clipped = np.maximum(distances, br + radii[np.newaxis, s0:s1])
+
+            # strength / distance, zero for self-interaction
+            denominator = clipped * clipped * distances
+            factors = np.divide(G * masses[np.newaxis, s0:s1], denominator,
+                                out=np.zeros_like(denominator), where=distances > 0)
+
+            ax[t0:t1] += (factors * rx).sum(axis=1)
+            ay[t0:t1] += (factors * ry).sum(axis=1)
+
+    return ax, ay
+
+
+class DirectSumEngine(ForceEngine):
+    """Exact O(n²) direct summation, vectorized in blocks."""
+
+    name = "direct"
+    label = "Direct"
+
+    def __init__(self, tile_size=FORCE_TILE_SIZE):
+        self.tile_size = max(1, int(tile_size))
+
+    def compute_accelerations(self, bodies, targets=None):
+        x, y, radii = bodies.x, bodies.y, bodies.radius
+        if targets is None:
+            tx, ty, tr = x, y, radii
+        else:
+            tx, ty, tr = x[targets], y[targets], radii[targets]
+        return direct_accelerations(x, y, bodies.mass, radii, tx, ty, tr, self.tile_size)
@@ -2,8 +2,9 @@ import pygame
 import pygame_gui
 from setup.config import *
 from core.scene import Scene
+from core.checkpoints import CheckpointHistory
 from ui.ui_events import handle_event
-from ui.ui_actions import set_input_defaults
+from ui.ui_actions import set_input_defaults, record_frame, advance_replay
 from ui.ui_manager import UIManager
 
 
@@ -24,10 +25,22 @@ class UIState:
         self.radius_input_edit = ui_manager.get("radius_input_edit")
         self.vx_input_edit = ui_manager.get("vx_input_edit")
         self.vy_input_edit = ui_manager.get("vy_input_edit")
-        self.field_toggle_button = ui_manager.get("field_toggle_button")
+        self.toggle_field_button = ui_manager.get("toggle_field_button")
+        self.field_theta_slider = ui_manager.get("field_theta_slider")
+        self.force_engine_button = ui_manager.get("force_engine_button")
+        self.integrator_button = ui_manager.get("integrator_button")
+        self.timings_button = ui_manager.get("timings_button")
+        self.lod_mode_button = ui_manager.get("lod_mode_button")
+        self.lod_threshold_slider = ui_manager.get("lod_threshold_slider")
         self.pause_button = ui_manager.get("pause_button")
         self.reset_button = ui_manager.get("reset_button")
+        self.rewind_button = ui_manager.get("rewind_button")
+        self.save_button = ui_manager.get("save_button")
+        self.record_button = ui_manager.get("record_button")
+        self.replay_slider = ui_manager.get("replay_slider")
+        self.load_button = ui_manager.get("load_button")
         self.toggle_trail_button = ui_manager.get("toggle_trail_button")
+        self.trail_mode_button = ui_manager.get("trail_mode_button")
         self.trail_length_slider = ui_manager.get("trail_length_slider")
         self.toggle_velocity_vectors_button = ui_manager.get("toggle_velocity_vectors_button")
         self.return_button_settings = ui_manager.get("return_button_settings")
@@ -53,6 +66,11 @@ class SimulationState:
         self.elapsed_time = 0
         self.panning = False
         self.last_pan_pos = None
+        # Active TrajectoryRecorder while recording, TrajectoryReader (and its shown frame) while replaying
+        self.recorder = None
+        self.replay = None
+        self.replay_index = 0
+        self.checkpoints = CheckpointHistory()
 
 
 class App:
@@ -75,9 +93,13 @@ class App:
 
     def run(self):        
         running = True
+        physics_step = 1.0 / PHYSICS_HZ
+        accumulator = 0.0
+        profiler = self.sim.scene.profiler
 
         while running:
             time_delta = self.clock.tick(FPS) / 1000.0
+            profiler.end_frame(time_delta)
             try:
                 if self.sim.speed_multiplier <= 0:
                     self.sim.speed_multiplier = 1.0  # Prevent zero or negative speeds
@@ -91,19 +113,51 @@ class App:
             
 
             # Handle events
+            profiler.start("events")
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
                 else:
                     handle_event(event, self.ui, self.sim)
-
-            # Update your simulation with physics etc.    
-            if not self.sim.paused:
-
-                self.sim.elapsed_time += effective_time_delta
-                self.sim.scene.update(effective_time_delta)
+            profiler.stop("events")
+
+            # Advance physics in fixed steps, independent of the render frame rate
+            profiler.start("physics")
+            if self.sim.replay is not None:
+                # Replays show recorded frames instead of simulating
+                if not self.sim.paused:
+                    advance_replay(self.ui, self.sim, time_delta * self.sim.speed_multiplier)
+                self.sim.scene.render_alpha = 1.0
+            elif not self.sim.paused:
+                accumulator += time_delta
+                substeps = 0
+                while accumulator >= physics_step and substeps < MAX_PHYSICS_SUBSTEPS:
+                    self.sim.scene.save_render_state()
+                    step = physics_step * self.sim.speed_multiplier
+                    self.sim.checkpoints.before_step(self.sim.scene, self.sim.elapsed_time, step)
+                    self.sim.elapsed_time += step
+                    self.sim.scene.update(step)
+                    if self.sim.recorder is not None:
+                        record_frame(self.ui, self.sim)
+                    accumulator -= physics_step
+                    substeps += 1
+
+                # Drop the backlog rather than spiralling when physics can't keep up
+                if accumulator >= physics_step:
+                    accumulator %= physics_step
+
+                # Draw part-way between the last two physics states
+                self.sim.scene.render_alpha = accumulator / physics_step
+            else:
+                self.sim.scene.render_alpha = 1.0
+            profiler.stop("physics")
 
             self.sim.scene.draw(self.screen, self.font, self.sim)
+            if profiler.enabled:
+                scene = self.sim.scene
+                cache_lines = [f"{name} cache {cache.hit_rate:.0%} hits, {len(cache)} held, {cache.evictions} evicted"
+                               for name, cache in (("label", scene.label_cache), ("sprite", scene.sprite_cache))]
+                profiler.draw_overlay(self.screen, self.font, (SIDEBAR_WIDTH + 10, HORIZONTAL_BAR_HEIGHT + 10), cache_lines)
 
             # Calculate FPS
             fps = self.clock.get_fps()
@@ -118,10 +172,14 @@ class App:
 
 
             # Update and draw UI
+            profiler.start("ui")
             self.manager.update(effective_time_delta)
             self.manager.draw_ui(self.screen)
+            profiler.stop("ui")
 
+            profiler.start("flip")
             pygame.display.flip()
+            profiler.stop("flip")
 
     def format_elapsed_time(self, seconds: float) -> str:
         intervals = (
@@ -0,0 +1,254 @@
+import numpy as np
+from setup.config import G, BLOCK_TIMESTEP_LEVELS, BLOCK_TIMESTEP_ETA, BLOCK_TIMESTEP_PARTNERS
+
+
+class Integrator:
+    """
+    Interface for time integration schemes driving a Scene.
+
+    `step` advances the scene by `dt` using the scene's kick/drift primitives and force engine, then
+    resolves collisions once on the final positions.
+    """
+
+    name = "base"
+    label = "Base"
+
+    def step(self, scene, dt):
+        raise NotImplementedError
+
+    def reset(self):
+        """
+        Drop any state carried between steps. The scene never calls this: integrators with such state
+        compare the store's `version` at each step and reset themselves when the bodies were edited,
+        added, loaded or restored in between.
+        """
+        pass
+
+    def state(self, scene):
+        """Copy of the state carried between steps, for checkpoints (None for stateless schemes)."""
+        return None
+
+    def restore(self, state, scene):
+        """Resume from a state returned by `state()` after the scene's bodies were restored."""
+        pass
+
+
+class SemiImplicitEuler(Integrator):
+    """First-order: kick with the current forces, then drift with the new velocities."""
+
+    name = "euler"
+    label = "Euler"
+
+    def step(self, scene, dt):
+        scene.update_object_velocities(dt)
+        scene.update_object_positions(dt)
+
+
+class Leapfrog(Integrator):
+    """Second-order symplectic kick-drift-kick leapfrog (one force evaluation per step)."""
+
+    name = "leapfrog"
+    label = "Leapfrog"
+
+    def step(self, scene, dt):
+        scene.kick(dt / 2, scene.current_accelerations())
+        scene.drift(dt)
+        scene.kick(dt / 2, scene.compute_accelerations())
+        scene.resolve_collisions()
+
+
+class VelocityVerlet(Integrator):
+    """Second-order velocity Verlet: full position update from x, v, a, then averaged velocity update."""
+
+    name = "verlet"
+    label = "Verlet"
+
+    def step(self, scene, dt):
+        bodies = scene.objects
+        accelerations = scene.current_accelerations().copy()
+        x, y = bodies.x, bodies.y
+        x += (bodies.vx + 0.5 * accelerations[:, 0] * dt) * dt
+        y += (bodies.vy + 0.5 * accelerations[:, 1] * dt) * dt
+        scene.invalidate_accelerations()
+        new_accelerations = scene.compute_accelerations()
+        scene.kick(dt, 0.5 * (accelerations + new_accelerations))
+        scene.resolve_collisions()
+
+
+# Yoshida's fourth-order coefficients built from three leapfrog stages
+_CBRT2 = 2 ** (1 / 3)
+_W1 = 1 / (2 - _CBRT2)
+_W0 = -_CBRT2 / (2 - _CBRT2)
+YOSHIDA_DRIFTS = (_W1 / 2, (_W0 + _W1) / 2, (_W0 + _W1) / 2, _W1 / 2)
+YOSHIDA_KICKS = (_W1, _W0, _W1)
+
+
+class Yoshida4(Integrator):
+    """Fourth-order symplectic Yoshida scheme (three force evaluations per step)."""
+
+    name = "yoshida4"
+    label = "Yoshida-4"
+
+    def step(self, scene, dt):
+        for drift, kick in zip(YOSHIDA_DRIFTS, YOSHIDA_KICKS):
+            scene.drift(drift * dt)
+            scene.kick(kick * dt, scene.compute_accelerations())
+        scene.drift(YOSHIDA_DRIFTS[-1] * dt)
+        scene.resolve_collisions()
+
+
+class BlockTimestepIntegrator(Integrator):
+    """
+    Hierarchical (power-of-two) block time-stepping on top of kick-drift-kick leapfrog.
+
+    Each frame step dt is split into 2**levels ticks and every body gets its own step dt / 2**level:
+    eta times the acceleration-to-jerk timescale of its tightest pair, taken pair by pair over the
+    heaviest bodies (see `_choose_levels`). All bodies are drifted to every step boundary (inactive ones
+    are thereby predicted), but forces are only recomputed for the bodies whose step ends there. A body
+    may only move to a longer step at a boundary aligned with it, so every body finishes exactly at the
+    end of the frame step. A force call for a subset costs in proportion to its size with the direct
+    engines; Barnes–Hut and particle-mesh add a fixed cost per call (the tree build or mesh solve over
+    all bodies).
+    """
+
+    name = "block"
+    label = "Block Steps"
+
+    def __init__(self, levels=BLOCK_TIMESTEP_LEVELS, eta=BLOCK_TIMESTEP_ETA, partners=BLOCK_TIMESTEP_PARTNERS):
+        self.levels = max(0, int(levels))
+        self.eta = eta
+        self.partners = max(1, int(partners))
+        # Number of single-body force evaluations, for comparing against a global timestep
+        self.force_evaluations = 0
+        self.reset()
+
+    def reset(self):
+        self._time = 0.0
+        self._version = None
+        self._levels = None
+
+    def state(self, scene):
+        # Step levels are only carried over while the bodies are unchanged since the last step
+        if self._levels is None or self._version != scene.objects.version:
+            return {"time": self._time}
+        return {"time": self._time, "levels": self._levels.copy()}
+
+    def restore(self, state, scene):
+        self.reset()
+        self._time = state["time"]
+        if "levels" in state:
+            self._levels = state["levels"].copy()
+            self._version = scene.objects.version
+
+    def _choose_levels(self, scene, indices, partners, dt):
+        """
+        Step level of each body in `indices` from its tightest pair with one of the `partners`.
+
+        A pair's timescale is the ratio of its relative acceleration to its jerk: the shorter of its
+        orbital time sqrt(r³ / G(m_i + m_j)) and its crossing time r / |v_i - v_j|. Taking it per pair
+        rather than from the total force keeps a weak but fast partner (the Moon, for the Earth) from
+        being masked by a strong slow one (the Sun), and puts both members of a tight pair on the same
+        level. That matters because a body is only predicted between its own steps, and a partner that
+        takes finer steps would read its force from that prediction.
+        """
+        bodies = scene.objects
+        x, y, vx, vy, masses = bodies.x, bodies.y, bodies.vx, bodies.vy, bodies.mass
+        px, py, pvx, pvy, pm = x[partners], y[partners], vx[partners], vy[partners], masses[partners]
+        rates = np.zeros(indices.shape[0])
+
+        # Rows per batch, so the temporaries stay around a million pairs
+        batch = max(1, 2**20 // partners.shape[0])
+        for b0 in range(0, indices.shape[0], batch):
+            rows = indices[b0:b0 + batch, np.newaxis]
+            rx = px - x[rows]
+            ry = py - y[rows]
+            r2 = rx * rx + ry * ry
+            v2 = (pvx - vx[rows]) ** 2 + (pvy - vy[rows]) ** 2
+            with np.errstate(divide="ignore", invalid="ignore"):
+                squared = np.maximum(G * (masses[rows] + pm) / (r2 * np.sqrt(r2)), v2 / r2)
+            # A body is not its own partner
+            squared = np.where(r2 > 0, squared, 0.0)
+            rates[b0:b0 + batch] = np.sqrt(squared.max(axis=1))
+
+        with np.errstate(divide="ignore"):
+            step = np.where(rates > 0, self.eta / rates, dt)
+        levels = np.ceil(np.log2(dt / np.minimum(step, dt)))
+        return np.clip(levels, 0, self.levels).astype(np.int64)
+
+    def step(self, scene, dt):
+        bodies = scene.objects
+        n = len(bodies)
+        if self._version != bodies.version or self._levels is None or len(self._levels) != n:
+            self.reset()
+
+        total_ticks = 2 ** self.levels
+        tick_dt = dt / total_ticks
+
+        # Pair partners for the step sizes: the heaviest bodies (masses don't change within a step)
+        if n > self.partners:
+            partners = np.argpartition(bodies.mass, n - self.partners)[n - self.partners:]
+        else:
+            partners = np.arange(n)
+
+        accelerations = scene.current_accelerations().copy()
+        if self._levels is None:
+            self._levels = self._choose_levels(scene, np.arange(n), partners, dt)
+        step_ticks = 2 ** (self.levels - np.minimum(self._levels, self.levels))
+        end_ticks = step_ticks.copy()
+
+        # Opening half kick for everyone
+        vx, vy = bodies.vx, bodies.vy
+        half = 0.5 * tick_dt * step_ticks
+        vx += accelerations[:, 0] * half
+        vy += accelerations[:, 1] * half
+
+        tick = 0
+        while tick < total_ticks:
+            next_tick = int(end_ticks.min())
+            scene.drift((next_tick - tick) * tick_dt)
+            tick = next_tick
+
+            active = np.nonzero(end_ticks == tick)[0]
+            if active.size == n:
+                new_accelerations = scene.compute_accelerations()
+            else:
+                new_accelerations = scene.compute_accelerations(active)
+            self.force_evaluations += active.size
+
+            # Closing half kick of the step that just ended
+            half = 0.5 * tick_dt * step_ticks[active]
+            vx[active] += new_accelerations[:, 0] * half
+            vy[active] += new_accelerations[:, 1] * half
+
+            new_levels = self._choose_levels(scene, active, partners, dt)
+            self._levels[active] = new_levels
+            if tick < total_ticks:
+                # Longer steps are only allowed where they stay aligned to the block hierarchy
+                new_steps = 2 ** (self.levels - new_levels)
+                while True:
+                    misaligned = tick % new_steps != 0
+                    if not misaligned.any():
+                        break
+                    new_steps[misaligned] //= 2
+                step_ticks[active] = new_steps
+                end_ticks[active] = tick + new_steps
+
+                # Opening half kick of the next step
+                half = 0.5 * tick_dt * new_steps
+                vx[active] += new_accelerations[:, 0] * half
+                vy[active] += new_accelerations[:, 1] * half
+
+        self._time += dt
+        scene.max_velocity = np.max(np.sqrt(vx**2 + vy**2))
+        scene.resolve_collisions()
+        self._version = bodies.version
+
+
+# Available integration schemes, selectable per scene by name
+INTEGRATORS = {
+    "euler": SemiImplicitEuler,
+    "leapfrog": Leapfrog,
+    "verlet": VelocityVerlet,
+    "yoshida4": Yoshida4,
+    "block": BlockTimestepIntegrator,
+}
@@ -0,0 +1,191 @@
+import multiprocessing as mp
+import os
+import traceback
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from core.force_engines import ForceEngine, direct_accelerations
+from setup.config import FORCE_TILE_SIZE, PARALLEL_WORKERS, PARALLEL_MIN_PAIRS
+
+# Arrays shared between the engine and its workers: name -> dtype, each `capacity` entries long
+SHARED_ARRAYS = {
+    "x": np.float64,
+    "y": np.float64,
+    "mass": np.float64,
+    "radius": np.float64,
+    "targets": np.int64,
+    "ax": np.float64,
+    "ay": np.float64,
+}
+
+
+def _attach(names, capacity):
+    """Map the named shared memory blocks as arrays; returns (blocks, arrays)."""
+    # Workers share the engine's resource tracker (see _start), so attaching only repeats the engine's
+    # registration and the engine's unlink() later clears it; unregistering here would clear it early
+    blocks = {key: shared_memory.SharedMemory(name=name) for key, name in names.items()}
+    arrays = {key: np.ndarray((capacity,), dtype=SHARED_ARRAYS[key], buffer=block.buf) for key, block in blocks.items()}
+    return blocks, arrays
+
+
+def _compute_chunk(arrays, sources, start, end, tile_size):
+    x, y = arrays["x"][:sources], arrays["y"][:sources]
+    masses, radii = arrays["mass"][:sources], arrays["radius"][:sources]
+    rows = arrays["targets"][start:end]
+    ax, ay = direct_accelerations(x, y, masses, radii, x[rows], y[rows], radii[rows], tile_size)
+    arrays["ax"][start:end] = ax
+    arrays["ay"][start:end] = ay
+
+
+def _worker(commands, results, tile_size):
+    """
+    Worker loop: wait for a chunk of target rows, compute them with the direct kernel, write them in place.
+
+    Messages are small tuples: ("attach", names, capacity) after the shared arrays are (re)allocated,
+    ("compute", sources, start, end) for target rows start:end, and None to exit.
+    """
+    blocks, arrays = {}, {}
+    while True:
+        message = commands.get()
+        if message is None:
+            break
+        try:
+            if message[0] == "attach":
+                arrays = {}
+                for block in blocks.values():
+                    block.close()
+                blocks, arrays = _attach(message[1], message[2])
+                continue
+
+            _, sources, start, end = message
+            _compute_chunk(arrays, sources, start, end, tile_size)
+            results.put(("done", start))
+        except Exception:
+            results.put(("error", traceback.format_exc()))
+    arrays = {}
+    for block in blocks.values():
+        block.close()
+
+
+def _shutdown(processes, commands, blocks):
+    """Stop the workers and release the shared memory (also run when the engine is garbage collected)."""
+    for queue in commands:
+        try:
+            queue.put(None)
+        except (OSError, ValueError):
+            pass
+    for process in processes:
+        process.join(timeout=2)
+        if process.is_alive():
+            process.terminate()
+    for block in blocks.values():
+        block.close()
+        block.unlink()
+
+
+class ParallelDirectEngine(ForceEngine):
+    """
+    Exact direct summation split across a persistent pool of worker processes.
+
+    Positions, masses and radii are copied once per call into shared memory arrays the workers have
+    mapped; each worker then computes a contiguous slice of the target rows with the same tiled kernel as
+    DirectSumEngine and writes its accelerations back in place, so only a few integers cross the process
+    boundary per step. The pool is started lazily and the arrays are reallocated (doubling) as the scene
+    grows. Problems smaller than PARALLEL_MIN_PAIRS interactions run in-process.
+    """
+
+    name = "parallel"
+    label = "Parallel Direct"
+
+    def __init__(self, workers=PARALLEL_WORKERS, tile_size=FORCE_TILE_SIZE, min_pairs=PARALLEL_MIN_PAIRS):
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.tile_size = max(1, int(tile_size))
+        self.min_pairs = min_pairs
+        self._processes = []
+        self._commands = []
+        self._results = None
+        self._blocks = {}
+        self._arrays = {}
+        self._capacity = 0
+        self._finalizer = None
+
+    def _start(self):
+        methods = mp.get_all_start_methods()
+        # Forked workers don't re-run the app's entry script the way spawned ones would
+        context = mp.get_context("fork" if "fork" in methods else "spawn")
+        # Started before the workers so they inherit it rather than launching trackers of their own,
+        # which would unlink the engine's blocks when a worker exits
+        resource_tracker.ensure_running()
+        self._results = context.Queue()
+        for _ in range(self.workers):
+            commands = context.Queue()
+            process = context.Process(target=_worker, args=(commands, self._results, self.tile_size), daemon=True)
+            process.start()
+            self._processes.append(process)
+            self._commands.append(commands)
+        self._finalizer = weakref.finalize(self, _shutdown, self._processes, self._commands, self._blocks)
+
+    def _ensure_capacity(self, count):
+        if count <= self._capacity:
+            return
+        capacity = max(self._capacity, 1024)
+        while capacity < count:
+            capacity *= 2
+
+        old_blocks = dict(self._blocks)
+        self._arrays = {}
+        self._blocks.clear()
+        for key, dtype in SHARED_ARRAYS.items():
+            block = shared_memory.SharedMemory(create=True, size=capacity * np.dtype(dtype).itemsize)
+            self._blocks[key] = block
+            self._arrays[key] = np.ndarray((capacity,), dtype=dtype, buffer=block.buf)
+        self._capacity = capacity
+
+        names = {key: block.name for key, block in self._blocks.items()}
+        for commands in self._commands:
+            commands.put(("attach", names, capacity))
+        # Queues are FIFO per worker, so the old blocks are unused once every worker has attached anew
+        for block in old_blocks.values():
+            block.close()
+            block.unlink()
+
+    def compute_accelerations(self, bodies, targets=None):
+        x, y, masses, radii = bodies.x, bodies.y, bodies.mass, bodies.radius
+        n = x.shape[0]
+        targets = np.arange(n) if targets is None else np.asarray(targets)
+        count = targets.shape[0]
+
+        if self.workers == 1 or n * count < self.min_pairs:
+            return direct_accelerations(x, y, masses, radii, x[targets], y[targets], radii[targets], self.tile_size)
+
+        if not self._processes:
+            self._start()
+        self._ensure_capacity(n)
+        arrays = self._arrays
+        arrays["x"][:n] = x
+        arrays["y"][:n] = y
+        arrays["mass"][:n] = masses
+        arrays["radius"][:n] = radii
+        arrays["targets"][:count] = targets
+
+        bounds = np.linspace(0, count, min(self.workers, count) + 1).astype(np.int64).tolist()
+        for commands, start, end in zip(self._commands, bounds[:-1], bounds[1:]):
+            commands.put(("compute", n, start, end))
+        # Wait for every chunk before reporting a failure, so no stale replies are left queued
+        errors = [detail for status, detail in (self._results.get() for _ in range(len(bounds) - 1))
+                  if status == "error"]
+        if errors:
+            raise RuntimeError(f"Parallel force worker failed:\n{errors[0]}")
+
+        return arrays["ax"][:count].copy(), arrays["ay"][:count].copy()
+
+    def close(self):
+        """Stop the worker pool and free the shared memory."""
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._processes.clear()
+        self._commands.clear()
+        self._blocks.clear()
+        self._arrays = {}
+        self._capacity = 0
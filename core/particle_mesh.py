@@ -0,0 +1,168 @@
+import numpy as np
+from core.force_engines import ForceEngine
+from core.spatial_hash import close_pair_chunks
+from setup.config import G, PM_MESH_SIZE, PM_SHORT_RANGE, PM_SPLIT_CELLS, PM_CUTOFF_SPLITS, PM_PAIR_CHUNK
+
+
+def _erf(x):
+    """Vectorized error function (Abramowitz & Stegun 7.1.26, |error| < 1.5e-7)."""
+    sign = np.sign(x)
+    x = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return sign * (1.0 - poly * np.exp(-x * x))
+
+
+def long_range_fraction(r, split):
+    """
+    Fraction of the 1/r² force carried by the mesh for a Gaussian force split of scale `split`.
+
+    Goes to 0 at short range and to 1 well beyond a few split lengths. Small separations use the
+    series expansion, since the closed form cancels catastrophically there.
+    """
+    u = r / (2 * split)
+    u2 = u * u
+    series = 2 / np.sqrt(np.pi) * u * u2 * (2 / 3 - u2 * (2 / 5 - u2 * (1 / 7 - u2 / 27)))
+    closed = _erf(u) - r / (split * np.sqrt(np.pi)) * np.exp(-u2)
+    return np.where(u < 0.3, series, closed)
+
+
+class ParticleMeshEngine(ForceEngine):
+    """
+    Particle-mesh gravity on a 2D grid, with an optional P³M short-range correction.
+
+    Masses are deposited with cloud-in-cell weights, the grid is convolved with the 1/r² Green's
+    function through `numpy.fft` (zero padded to 2M x 2M so the domain is isolated rather than
+    periodic) and accelerations are interpolated back with the same weights. The bodies move in a plane
+    but still attract with the 3D inverse-square law, so the convolution uses that kernel rather than the
+    2D Poisson solution. Without the correction, forces are softened to one mesh cell; with it, the mesh
+    only carries the smooth long-range part and close pairs are summed directly with the usual radius
+    clipping. The correction visits every pair within a few mesh cells, a number that grows as n², so it
+    is off by default. For a subset of targets, every body still feeds the mesh, but only the targets
+    read the field back and only pairs involving a target are corrected.
+    """
+
+    name = "particle_mesh"
+    label = "Particle-Mesh"
+
+    def __init__(self, mesh_size=PM_MESH_SIZE, short_range=PM_SHORT_RANGE, split_cells=PM_SPLIT_CELLS,
+                 cutoff_splits=PM_CUTOFF_SPLITS, pair_chunk=PM_PAIR_CHUNK):
+        self.mesh_size = max(4, int(mesh_size))
+        self.short_range = short_range
+        self.split_cells = split_cells
+        self.cutoff_splits = cutoff_splits
+        self.pair_chunk = max(1, int(pair_chunk))
+        self._kernel_key = None
+        self._kernel_hat = None
+
+    def _kernel_spectrum(self):
+        """FFT of the acceleration kernel in cell units (independent of the cell size, so it is cached)."""
+        key = (self.mesh_size, self.short_range, self.split_cells)
+        if key != self._kernel_key:
+            m = self.mesh_size
+            offsets = np.arange(2 * m)
+            offsets = np.where(offsets < m, offsets, offsets - 2 * m).astype(float)
+            dx, dy = np.meshgrid(offsets, offsets, indexing="ij")
+            r = np.sqrt(dx * dx + dy * dy)
+
+            if self.short_range:
+                weight = long_range_fraction(r, self.split_cells)
+                denominator = r ** 3
+            else:
+                weight = np.ones_like(r)
+                denominator = np.maximum(r, 1.0) ** 2 * r
+            factors = np.divide(weight, denominator, out=np.zeros_like(r), where=r > 0)
+
+            # Acceleration at offset d from a unit mass points back towards the mass
+            self._kernel_hat = (np.fft.rfft2(-dx * factors), np.fft.rfft2(-dy * factors))
+            self._kernel_key = key
+        return self._kernel_hat
+
+    def compute_accelerations(self, bodies, targets=None):
+        x, y, masses, radii = bodies.x, bodies.y, bodies.mass, bodies.radius
+        m = self.mesh_size
+        if x.size == 0:
+            return np.zeros(0), np.zeros(0)
+
+        # Square mesh over the bounding box, with a cell of margin for the CIC stencil
+        xmin, xmax = x.min(), x.max()
+        ymin, ymax = y.min(), y.max()
+        span = max(xmax - xmin, ymax - ymin)
+        cell = span / (m - 3) if span > 0 else max(2 * radii.max(), 1.0)
+        origin_x = (xmin + xmax) / 2 - m * cell / 2
+        origin_y = (ymin + ymax) / 2 - m * cell / 2
+
+        grid = np.zeros(m * m)
+        for flat, w in self._stencil(x, y, origin_x, origin_y, cell):
+            grid += np.bincount(flat, masses * w, minlength=m * m)
+
+        padded = np.zeros((2 * m, 2 * m))
+        padded[:m, :m] = grid.reshape(m, m)
+        mass_hat = np.fft.rfft2(padded)
+        kernel_x, kernel_y = self._kernel_spectrum()
+        scale = G / (cell * cell)
+        grid_ax = np.fft.irfft2(mass_hat * kernel_x, s=padded.shape)[:m, :m].ravel() * scale
+        grid_ay = np.fft.irfft2(mass_hat * kernel_y, s=padded.shape)[:m, :m].ravel() * scale
+
+        # Every body feeds the mesh, but the field is only read back (and corrected) at the targets
+        tx, ty = (x, y) if targets is None else (x[targets], y[targets])
+        ax = np.zeros(tx.shape[0])
+        ay = np.zeros(tx.shape[0])
+        for flat, w in self._stencil(tx, ty, origin_x, origin_y, cell):
+            ax += grid_ax[flat] * w
+            ay += grid_ay[flat] * w
+
+        if self.short_range:
+            self._add_short_range(x, y, masses, radii, cell, ax, ay, targets)
+        return ax, ay
+
+    def _stencil(self, x, y, origin_x, origin_y, cell):
+        """Flat mesh indices and cloud-in-cell weights of the four cells around each point."""
+        m = self.mesh_size
+        # Weights are relative to cell centres
+        gx = (x - origin_x) / cell - 0.5
+        gy = (y - origin_y) / cell - 0.5
+        ix = np.floor(gx).astype(np.int64)
+        iy = np.floor(gy).astype(np.int64)
+        fx = gx - ix
+        fy = gy - iy
+        return (
+            (ix * m + iy, (1 - fx) * (1 - fy)),
+            ((ix + 1) * m + iy, fx * (1 - fy)),
+            (ix * m + iy + 1, (1 - fx) * fy),
+            ((ix + 1) * m + iy + 1, fx * fy),
+        )
+
+    def _add_short_range(self, x, y, masses, radii, cell, ax, ay, targets=None):
+        """
+        Replace the mesh force of close pairs by the exact radius-clipped pair force.
+
+        Pairs are walked in chunks of PM_PAIR_CHUNK from the spatial hash, so memory stays bounded at any
+        body count; with `targets`, only pairs involving a target are visited.
+        """
+        split = self.split_cells * cell
+        n = x.shape[0]
+        size = ax.shape[0]
+        if targets is not None:
+            # Position of each target in the output arrays
+            slot = np.zeros(n, dtype=np.int64)
+            slot[targets] = np.arange(size)
+
+        for i, j in close_pair_chunks(x, y, self.cutoff_splits * split, self.pair_chunk, targets):
+            if i.size == 0:
+                continue
+            rx = x[j] - x[i]
+            ry = y[j] - y[i]
+            d = np.sqrt(rx * rx + ry * ry)
+            separated = d > 0
+            d_safe = np.where(separated, d, 1.0)
+            clipped = np.maximum(d, radii[i] + radii[j])
+            short = 1 / (clipped * clipped) - long_range_fraction(d_safe, split) / (d_safe * d_safe)
+            factors = np.where(separated, G * short / d_safe, 0.0)
+
+            if targets is None:
+                ax += np.bincount(i, factors * masses[j] * rx, minlength=n) - np.bincount(j, factors * masses[i] * rx, minlength=n)
+                ay += np.bincount(i, factors * masses[j] * ry, minlength=n) - np.bincount(j, factors * masses[i] * ry, minlength=n)
+            else:
+                ax += np.bincount(slot[i], factors * masses[j] * rx, minlength=size)
+                ay += np.bincount(slot[i], factors * masses[j] * ry, minlength=size)
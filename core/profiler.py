@@ -0,0 +1,141 @@
+import csv
+import time
+import numpy as np
+import pygame
+from setup.config import PROFILER_HISTORY_FRAMES, PROFILER_HISTOGRAM_BINS, PROFILER_OVERLAY_COLOR
+
+
+class FrameProfiler:
+    """
+    Lightweight per-stage frame timer.
+
+    Stages are timed with `start(name)` / `stop(name)` pairs and collected per frame by `end_frame`.
+    The last `history` frames are kept in ring buffers, from which the overlay reads a rolling per-stage
+    breakdown and frame-time percentiles. Stages may nest (e.g. "collisions" runs inside "physics"), so
+    their times are not meant to add up. When disabled every call returns immediately.
+    """
+
+    def __init__(self, history=PROFILER_HISTORY_FRAMES):
+        self.enabled = False
+        self.history = history
+        self.stage_names = []
+        self._stage_times = {}
+        self._frame_times = np.zeros(history)
+        self._frame_index = 0
+        self.frames_recorded = 0
+        self._current = {}
+        self._starts = {}
+
+    def start(self, name):
+        if not self.enabled:
+            return
+        self._starts[name] = time.perf_counter()
+
+    def stop(self, name):
+        if not self.enabled:
+            return
+        start = self._starts.pop(name, None)
+        if start is not None:
+            self._current[name] = self._current.get(name, 0.0) + time.perf_counter() - start
+
+    def end_frame(self, frame_seconds):
+        """Store this frame's stage times and total frame time in the rolling history."""
+        # Skip frames with no timed stages, such as the one the profiler was switched on during
+        if not self.enabled or not self._current:
+            return
+        slot = self._frame_index % self.history
+        for name in self._current:
+            if name not in self._stage_times:
+                self.stage_names.append(name)
+                self._stage_times[name] = np.zeros(self.history)
+        for name, samples in self._stage_times.items():
+            samples[slot] = self._current.get(name, 0.0)
+        self._frame_times[slot] = frame_seconds
+        self._frame_index += 1
+        self.frames_recorded = min(self.frames_recorded + 1, self.history)
+        self._current.clear()
+        self._starts.clear()
+
+    def reset(self):
+        self.stage_names = []
+        self._stage_times = {}
+        self._frame_times[:] = 0
+        self._frame_index = 0
+        self.frames_recorded = 0
+        self._current.clear()
+        self._starts.clear()
+
+    def _ordered(self, samples):
+        """Recorded samples from oldest to newest."""
+        if self.frames_recorded < self.history:
+            return samples[:self.frames_recorded]
+        return np.roll(samples, -(self._frame_index % self.history))
+
+    def breakdown(self):
+        """Mean seconds per frame for each stage over the history window."""
+        if not self.frames_recorded:
+            return {}
+        return {name: float(self._ordered(self._stage_times[name]).mean()) for name in self.stage_names}
+
+    def frame_percentiles(self, percentiles=(50, 95, 99)):
+        """Frame-time percentiles in seconds over the history window."""
+        if not self.frames_recorded:
+            return {p: 0.0 for p in percentiles}
+        values = np.percentile(self._ordered(self._frame_times), percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
+    def frame_histogram(self, bins=PROFILER_HISTOGRAM_BINS):
+        """Counts and bin edges (seconds) of the recorded frame times."""
+        return np.histogram(self._ordered(self._frame_times), bins=bins)
+
+    def dump_csv(self, path):
+        """Write one row per recorded frame: frame index, frame time and every stage time (ms)."""
+        frames = self._ordered(self._frame_times)
+        stages = [self._ordered(self._stage_times[name]) for name in self.stage_names]
+        first_frame = self._frame_index - frames.shape[0]
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "frame_ms"] + [f"{name}_ms" for name in self.stage_names])
+            for row in range(frames.shape[0]):
+                writer.writerow([first_frame + row, f"{frames[row] * 1e3:.4f}"]
+                                + [f"{stage[row] * 1e3:.4f}" for stage in stages])
+        return path
+
+    def draw_overlay(self, surface, font, origin, extra_lines=()):
+        """Draw the per-stage breakdown, any extra text lines, frame-time percentiles and a histogram at `origin`."""
+        if not self.enabled:
+            return
+        x, y = origin
+        line_height = font.get_linesize()
+        percentiles = self.frame_percentiles()
+        lines = [
+            f"frame  p50 {percentiles[50] * 1e3:6.2f}  p95 {percentiles[95] * 1e3:6.2f}  "
+            f"p99 {percentiles[99] * 1e3:6.2f} ms",
+        ]
+        lines += [f"{name:>12} {seconds * 1e3:7.2f} ms" for name, seconds in self.breakdown().items()]
+        lines += list(extra_lines)
+
+        width = max(font.size(line)[0] for line in lines)
+        histogram_height = 40
+        height = line_height * (len(lines) + 1) + histogram_height + 12
+        background = pygame.Surface((width + 12, height), pygame.SRCALPHA)
+        background.fill((0, 0, 0, 160))
+        surface.blit(background, (x - 6, y - 4))
+
+        for line in lines:
+            surface.blit(font.render(line, True, PROFILER_OVERLAY_COLOR), (x, y))
+            y += line_height
+
+        if not self.frames_recorded:
+            return
+        # Frame-time histogram: one bar per bin, scaled to the fullest bin
+        counts, edges = self.frame_histogram()
+        y += histogram_height + 4
+        bar_width = max(1, width // len(counts))
+        for i, count in enumerate(counts):
+            bar_height = int(histogram_height * count / counts.max())
+            if bar_height:
+                pygame.draw.rect(surface, PROFILER_OVERLAY_COLOR,
+                                 (x + i * bar_width, y - bar_height, bar_width - 1, bar_height))
+        label = f"{edges[0] * 1e3:.1f} - {edges[-1] * 1e3:.1f} ms"
+        surface.blit(font.render(label, True, PROFILER_OVERLAY_COLOR), (x, y + 2))
@@ -0,0 +1,267 @@
+import json
+import queue
+import struct
+import threading
+import traceback
+import numpy as np
+from core.snapshot import align_offset, camera_state, write_header
+from setup.config import RECORD_EVERY_STEPS, RECORD_ENCODING, RECORD_CHUNK_FRAMES, RECORD_QUEUE_FRAMES
+
+# File layout: MAGIC, a little-endian (format version, header length, frames written) preamble, a JSON
+# header, the static body columns (id, mass, radius, colour), then fixed-size chunks of frames. Every
+# chunk holds RECORD_CHUNK_FRAMES frame times and a (frames, 4, bodies) block of x, y, vx, vy, so any frame
+# is read from a single chunk. The frame count is rewritten after every chunk, so an interrupted
+# recording stays readable up to its last complete chunk. Chunks sit at fixed offsets; the last one is
+# only as long as the frames written to it.
+MAGIC = b"GRAVTRAJ"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<IIQ")
+_FRAME_COUNT = struct.Struct("<Q")
+_FRAME_COUNT_OFFSET = len(MAGIC) + 8
+
+# How frame states are stored: "float64" exactly, "float32" quantized (half the size), or "delta":
+# float32 offsets from a float64 key frame at the start of each chunk (half the size, and precise to
+# float32 relative to how far a body moved within the chunk rather than to its distance from the origin)
+RECORD_ENCODINGS = ["float64", "float32", "delta"]
+
+STATIC_COLUMNS = ("id", "mass", "radius", "color")
+STATE_COLUMNS = ("x", "y", "vx", "vy")
+
+
+def _chunk_layout(encoding, chunk_frames, count):
+    """Byte offsets of the parts of one chunk, and the chunk size."""
+    state_dtype = np.float64 if encoding == "float64" else np.float32
+    parts = [("time", np.float64, (chunk_frames,))]
+    if encoding == "delta":
+        parts.append(("key", np.float64, (len(STATE_COLUMNS), count)))
+    parts.append(("state", state_dtype, (chunk_frames, len(STATE_COLUMNS), count)))
+
+    layout = {}
+    offset = 0
+    for name, dtype, shape in parts:
+        dtype = np.dtype(dtype).newbyteorder("<")
+        layout[name] = {"dtype": dtype.str, "shape": list(shape), "offset": offset}
+        offset = align_offset(offset + int(np.prod(shape)) * dtype.itemsize)
+    return layout, offset
+
+
+class TrajectoryRecorder:
+    """
+    Streams body positions and velocities to a chunked trajectory file from a background thread.
+
+    `record()` is called once per physics step; every `every_steps`-th call copies the state arrays and
+    queues them, and the writer thread encodes and writes whole chunks at a time. The queue
+    holds at most RECORD_QUEUE_FRAMES frames, after which `record()` waits for the writer, so a slow disk
+    slows the simulation rather than losing frames. A recording covers a fixed set of bodies; adding or
+    removing one raises ValueError from `record()`.
+    """
+
+    def __init__(self, path, scene, every_steps=RECORD_EVERY_STEPS, encoding=RECORD_ENCODING,
+                 chunk_frames=RECORD_CHUNK_FRAMES):
+        if encoding not in RECORD_ENCODINGS:
+            raise ValueError(f"Unknown recording encoding: {encoding}")
+        self.path = path
+        self.every_steps = max(1, int(every_steps))
+        self.encoding = encoding
+        self.chunk_frames = max(1, int(chunk_frames))
+        self.frames_recorded = 0
+        self.error = None
+        self._steps = 0
+
+        bodies = scene.objects
+        self.count = len(bodies)
+        self.ids = bodies.ids.copy()
+        self._layout, self._chunk_bytes = _chunk_layout(encoding, self.chunk_frames, self.count)
+
+        static = {column: np.ascontiguousarray(bodies.column(column)) for column in STATIC_COLUMNS}
+        header = {
+            "count": self.count,
+            "encoding": encoding,
+            "chunk_frames": self.chunk_frames,
+            "camera": camera_state(scene.camera),
+            "names": [[int(body_id), name] for body_id, name in bodies.names.items()],
+            "static": {},
+            "chunk_layout": self._layout,
+            "chunk_bytes": self._chunk_bytes,
+        }
+        self._file = open(path, "wb")
+        # The frame count in the preamble starts at zero and is rewritten after every chunk
+        write_header(self._file, MAGIC, _PREAMBLE, FORMAT_VERSION, header, "static", static,
+                     end_key="chunks_offset", preamble_tail=(0,))
+        self._chunks_offset = header["chunks_offset"]
+        self._file.flush()
+
+        self._queue = queue.Queue(maxsize=RECORD_QUEUE_FRAMES)
+        self._thread = threading.Thread(target=self._write_loop, name="trajectory-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, scene, time):
+        """Queue the scene's current state if this step is due; returns True when a frame was queued."""
+        self._steps += 1
+        if (self._steps - 1) % self.every_steps:
+            return False
+        bodies = scene.objects
+        if len(bodies) != self.count or not np.array_equal(bodies.ids, self.ids):
+            raise ValueError("Bodies were added or removed during the recording")
+        self._queue.put((float(time), np.stack([bodies.column(column) for column in STATE_COLUMNS])))
+        self.frames_recorded += 1
+        return True
+
+    def _write_loop(self):
+        times = np.empty(self.chunk_frames)
+        states = np.empty((self.chunk_frames, len(STATE_COLUMNS), self.count))
+        chunk = filled = 0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                # Keep draining so record() never blocks on a dead writer
+                continue
+            try:
+                times[filled], states[filled] = item
+                filled += 1
+                if filled == self.chunk_frames:
+                    self._write_chunk(chunk, times, states, filled)
+                    chunk += 1
+                    filled = 0
+            except Exception:
+                self.error = traceback.format_exc()
+        if filled and self.error is None:
+            try:
+                self._write_chunk(chunk, times, states, filled)
+            except Exception:
+                self.error = traceback.format_exc()
+
+    def _write_chunk(self, chunk, times, states, filled):
+        layout = self._layout
+        base = self._chunks_offset + chunk * self._chunk_bytes
+        if self.encoding == "delta":
+            key = states[0]
+            parts = {"key": key, "state": (states[:filled] - key).astype(np.float32)}
+        else:
+            parts = {"state": states[:filled].astype(layout["state"]["dtype"])}
+        parts["time"] = times[:filled]
+
+        f = self._file
+        for name, values in parts.items():
+            f.seek(base + layout[name]["offset"])
+            f.write(np.ascontiguousarray(values))
+        f.seek(_FRAME_COUNT_OFFSET)
+        f.write(_FRAME_COUNT.pack(chunk * self.chunk_frames + filled))
+        f.flush()
+
+    def close(self):
+        """Write the remaining frames and close the file; raises RuntimeError if the writer failed."""
+        if self._file.closed:
+            return self.path
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        if self.error is not None:
+            raise RuntimeError(f"Writing {self.path} failed:\n{self.error}")
+        return self.path
+
+
+class TrajectoryReader:
+    """
+    Random access to a recorded trajectory without re-simulating.
+
+    Frames are read through memory maps of a single chunk at a time (the most recent one is kept
+    open), so seeking anywhere in a long recording only touches the pages of the frames shown.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a gravity simulator recording")
+            version, header_length, self.frame_count = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if version > FORMAT_VERSION:
+                raise ValueError(f"{path} uses recording format {version}; this version reads up to {FORMAT_VERSION}")
+            self.header = json.loads(f.read(header_length).decode("utf-8"))
+        header = self.header
+        self.count = header["count"]
+        self.encoding = header["encoding"]
+        self.chunk_frames = header["chunk_frames"]
+        self.static = {column: self._map(spec["offset"], spec) for column, spec in header["static"].items()}
+        self._chunk = None
+        self._times = None
+
+    def _map(self, offset, spec):
+        shape = tuple(spec["shape"])
+        if 0 in shape:
+            return np.zeros(shape, dtype=spec["dtype"])
+        return np.memmap(self.path, dtype=spec["dtype"], mode="r", offset=offset, shape=shape)
+
+    def _chunk_specs(self, chunk):
+        """Layout of one chunk, cut down to the frames it actually holds (the last one may be partial)."""
+        frames = min(self.chunk_frames, self.frame_count - chunk * self.chunk_frames)
+        specs = {}
+        for name, spec in self.header["chunk_layout"].items():
+            if name in ("time", "state"):
+                spec = {**spec, "shape": [frames, *spec["shape"][1:]]}
+            specs[name] = spec
+        return specs
+
+    def _chunk_arrays(self, chunk):
+        if self._chunk is None or self._chunk[0] != chunk:
+            base = self.header["chunks_offset"] + chunk * self.header["chunk_bytes"]
+            arrays = {name: self._map(base + spec["offset"], spec) for name, spec in self._chunk_specs(chunk).items()}
+            self._chunk = (chunk, arrays)
+        return self._chunk[1]
+
+    @property
+    def times(self):
+        """Simulated time of every frame (reads only the time block of each chunk)."""
+        if self._times is None:
+            chunks = -(-self.frame_count // self.chunk_frames)
+            parts = [np.array(self._map(self.header["chunks_offset"] + chunk * self.header["chunk_bytes"],
+                                        self._chunk_specs(chunk)["time"]))
+                     for chunk in range(chunks)]
+            self._times = np.concatenate(parts) if parts else np.zeros(0)
+        return self._times
+
+    def frame(self, index):
+        """(time, state) of one frame, where state is a (4, bodies) float64 array of x, y, vx, vy."""
+        if not 0 <= index < self.frame_count:
+            raise IndexError("frame index out of range")
+        chunk, row = divmod(index, self.chunk_frames)
+        arrays = self._chunk_arrays(chunk)
+        state = arrays["state"][row].astype(np.float64)
+        if self.encoding == "delta":
+            state += arrays["key"]
+        return float(arrays["time"][row]), state
+
+    def index_at(self, time):
+        """Index of the last frame recorded at or before `time` (the first frame if none is)."""
+        return max(int(np.searchsorted(self.times, time, side="right")) - 1, 0)
+
+    def load_into(self, scene):
+        """Replace the scene's bodies with the recorded ones, at the first frame."""
+        time, state = self.frame(0)
+        bodies = scene.objects
+        bodies.clear()
+        bodies.extend(self.static["id"], *state, mass=self.static["mass"], radius=self.static["radius"],
+                      color=self.static["color"])
+        bodies.names.update((body_id, name) for body_id, name in self.header["names"])
+        scene.object_id_counter = int(self.static["id"].max()) + 1 if self.count else 0
+        for key, value in self.header["camera"].items():
+            setattr(scene.camera, key, value)
+        scene.trails.clear()
+        scene.invalidate_accelerations()
+        return time
+
+    def show(self, scene, index):
+        """Write frame `index` into the scene's position and velocity columns; returns its time."""
+        time, state = self.frame(index)
+        bodies = scene.objects
+        for column, values in zip(STATE_COLUMNS, state):
+            bodies.column(column)[:] = values
+        bodies.version += 1
+        scene.invalidate_accelerations()
+        return time
+
+    def close(self):
+        self._chunk = None
+        self.static = {}
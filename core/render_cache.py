@@ -0,0 +1,54 @@
+from collections import OrderedDict
+import pygame
+
+
+class SurfaceCache:
+    """
+    Bounded least-recently-used cache of rendered surfaces.
+
+    `get(key, render)` returns the cached surface for `key`, calling `render()` to create it on a miss.
+    Once more than `max_entries` surfaces are held the least recently used one is dropped. Hit, miss and
+    eviction counts are kept for the timing overlay and benchmarks.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, render):
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self._surfaces[key] = render()
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        self._surfaces.clear()
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._surfaces)
+
+
+def render_circle_sprite(radius, color):
+    """A transparent sprite holding the circle pygame.draw.circle draws; blit it at (x - radius - 1, y - radius - 1)."""
+    sprite = pygame.Surface((2 * radius + 2, 2 * radius + 2), pygame.SRCALPHA)
+    pygame.draw.circle(sprite, color, (radius + 1, radius + 1), radius)
+    return sprite
@@ -1,256 +1,453 @@
 import pygame
 from core.vector_field import VectorField
 from core.camera import Camera
+from core.body_store import BodyStore, BODY_COLUMNS
+from core.force_engines import DirectSumEngine
+from core.barnes_hut import BarnesHutEngine
+from core.particle_mesh import ParticleMeshEngine
+from core.parallel_forces import ParallelDirectEngine
+from core.spatial_hash import overlap_pairs
+from core import kernels
+from core.integrators import INTEGRATORS
+from core.profiler import FrameProfiler
+from core.trails import TrailBuffer, TrailRenderer
+from core.render_cache import SurfaceCache, render_circle_sprite
+from core.splat import splat_points
 import numpy as np
-from setup.config import SIDEBAR_WIDTH, WINDOW_WIDTH, SIDEBAR_WIDTH, WINDOW_HEIGHT, GRID_SIZE, COEFFICIENT_OF_RESTITUTION, VECTOR_FIELD_COLOR, G, VELOCITY_VECTOR_COLOR
+from setup.config import SIDEBAR_WIDTH, WINDOW_WIDTH, SIDEBAR_WIDTH, WINDOW_HEIGHT, GRID_SIZE, COEFFICIENT_OF_RESTITUTION, VECTOR_FIELD_COLOR, VELOCITY_VECTOR_COLOR, FORCE_ENGINE, INTEGRATOR, HEATMAP_CELL_SIZE, HEATMAP_COLORS, TRAIL_MIN_PIXEL_DISTANCE, TRAIL_RENDER_MODE, VIEW_CULL_MARGIN_PX, LABEL_CACHE_SIZE, SPRITE_CACHE_SIZE, SPRITE_CACHE_MAX_RADIUS, LOD_SPLAT_MODE, LOD_RADIUS_PX, FIELD_THETA
+
+# Field display modes, in the order the Toggle Field button cycles through them
+FIELD_MODES = ["vector", "heatmap", "none"]
+
+def colormap_lut(stops, size=256):
+    """Lookup table of `size` RGB colours interpolated evenly between the colour stops."""
+    stops = np.asarray(stops, dtype=float)
+    positions = np.linspace(0, 1, len(stops))
+    samples = np.linspace(0, 1, size)
+    return np.stack([np.interp(samples, positions, stops[:, c]) for c in range(3)], axis=1).astype(np.uint8)
+
+# Available gravity solvers, selectable per scene by name
+FORCE_ENGINES = {
+    "direct": DirectSumEngine,
+    "barnes_hut": BarnesHutEngine,
+    "particle_mesh": ParticleMeshEngine,
+    "parallel": ParallelDirectEngine,
+}
 
 class Scene:
-    def __init__(self):
+    def __init__(self, force_engine=FORCE_ENGINE, integrator=INTEGRATOR):
         self.camera = Camera()
-        self.objects = []
+        self.objects = BodyStore()
         self.field_mode = "vector"
         self.trail_enabled = True
         self.trail_length = 3 # Default trail length in seconds
         self.vectors_enabled = True
         self.object_id_counter = 0
 
+        self.trails = TrailBuffer(self.objects)
+        # Bodies below lod_threshold screen pixels in radius are splatted (lod_mode "off" draws them all)
+        self.lod_mode = LOD_SPLAT_MODE
+        self.lod_threshold = LOD_RADIUS_PX
+        # Opening angle (error tolerance) of the vector field's quadtree in many-body scenes
+        self.field_theta = FIELD_THETA
+        # Rendered labels and body sprites, reused across frames
+        self.label_cache = SurfaceCache(LABEL_CACHE_SIZE)
+        self.sprite_cache = SurfaceCache(SPRITE_CACHE_SIZE)
+        self.trail_renderer = TrailRenderer(self.camera, TRAIL_RENDER_MODE)
+        self._last_trail_time = None
         self.vector_field = VectorField(GRID_SIZE, self, self.camera)
-        self._cached_positions = None
-        self._cached_masses = None
+        # Coarser field sampled one cell beyond the view so the heatmap raster covers the edges
+        self.heatmap_field = VectorField(HEATMAP_CELL_SIZE, self, self.camera, margin_px=HEATMAP_CELL_SIZE)
+        self.heatmap_lut = colormap_lut(HEATMAP_COLORS)
+        # Field arrays the cached heatmap surface was built from, and that surface
+        self._heatmap_cache = None
         self.max_velocity = 0
         self.max_acceleration = 0
+        self.accelerations = np.zeros((0, 2))
+        # Store version the cached accelerations belong to (None when positions have moved since)
+        self._accelerations_version = None
+        # Positions before the last physics step and how far to blend towards the current ones
+        self._previous_positions = None
+        self.render_alpha = 1.0
+        # Per-stage frame timings, shown by the timing overlay (off by default)
+        self.profiler = FrameProfiler()
+        self.set_force_engine(force_engine)
+        self.set_integrator(integrator)
+
+    def set_force_engine(self, engine):
+        """Select the gravity solver, either by name or as a ForceEngine instance."""
+        if isinstance(engine, str):
+            if engine not in FORCE_ENGINES:
+                raise ValueError(f"Unknown force engine: {engine}")
+            engine = FORCE_ENGINES[engine]()
+        previous = getattr(self, "force_engine", None)
+        if previous is not None and previous is not engine:
+            previous.close()
+        self.force_engine = engine
+        self.invalidate_accelerations()
+
+    def set_integrator(self, integrator):
+        """Select the time integration scheme, either by name or as an Integrator instance."""
+        if isinstance(integrator, str):
+            if integrator not in INTEGRATORS:
+                raise ValueError(f"Unknown integrator: {integrator}")
+            integrator = INTEGRATORS[integrator]()
+        self.integrator = integrator
 
     def update(self, effective_time_delta):
-        self.update_object_velocities(effective_time_delta)
-        self.update_object_positions(effective_time_delta)
+        if len(self.objects) == 0:
+            return
+        self.integrator.step(self, effective_time_delta)
+
+    def save_render_state(self):
+        """Remember the current positions so drawing can interpolate across the next physics step."""
+        self._previous_positions = (self.objects.x.copy(), self.objects.y.copy(), self.objects.version)
+
+    def render_positions(self):
+        """Body positions to draw: blended by render_alpha between the last two physics states."""
+        x, y = self.objects.x, self.objects.y
+        previous = self._previous_positions
+        # Bodies added, removed or edited since the snapshot are drawn where they are now
+        if previous is None or previous[2] != self.objects.version or self.render_alpha >= 1:
+            return x, y
+        alpha = self.render_alpha
+        return previous[0] + (x - previous[0]) * alpha, previous[1] + (y - previous[1]) * alpha
+
+    def compute_accelerations(self, targets=None):
+        """
+        Evaluate the force engine and cache the result.
+
+        With `targets` (body indices) only those rows are recomputed and returned; the cache is then
+        not marked valid, since the other rows belong to earlier positions.
+        """
+        if targets is None:
+            ax, ay = self.force_engine.compute_accelerations(self.objects)
+            self.accelerations = np.column_stack((ax, ay))
+            self.max_acceleration = np.max(np.sqrt(ax**2 + ay**2)) if ax.size else 0
+            self._accelerations_version = self.objects.version
+            return self.accelerations
+
+        ax, ay = self.force_engine.compute_accelerations(self.objects, targets)
+        if len(self.accelerations) != len(self.objects):
+            self.accelerations = np.zeros((len(self.objects), 2))
+        self.accelerations[targets, 0] = ax
+        self.accelerations[targets, 1] = ay
+        return np.column_stack((ax, ay))
+
+    def current_accelerations(self):
+        """Cached accelerations if still valid for the current positions, otherwise recompute."""
+        if self._accelerations_version != self.objects.version or len(self.accelerations) != len(self.objects):
+            return self.compute_accelerations()
+        return self.accelerations
+
+    def invalidate_accelerations(self):
+        self._accelerations_version = None
+
+    def capture_state(self):
+        """
+        Copy everything the physics needs to continue from this moment: body arrays and names, the
+        solver and integrator (with the integrator's carried state) and the cached accelerations.
+        """
+        bodies = self.objects
+        valid = self._accelerations_version == bodies.version and len(self.accelerations) == len(bodies)
+        return {
+            "columns": {column: bodies.column(column).copy() for column in BODY_COLUMNS},
+            "names": dict(bodies.names),
+            "object_id_counter": self.object_id_counter,
+            "force_engine": self.force_engine,
+            "integrator": self.integrator,
+            "integrator_state": self.integrator.state(self),
+            "accelerations": self.accelerations.copy() if valid else None,
+            "max_velocity": self.max_velocity,
+            "max_acceleration": self.max_acceleration,
+        }
+
+    def restore_state(self, state):
+        """Return to a state from capture_state(); stepping on from it repeats the original run exactly."""
+        bodies = self.objects
+        columns = state["columns"]
+        bodies.clear()
+        bodies.extend(columns["id"], x=columns["x"], y=columns["y"], vx=columns["vx"], vy=columns["vy"],
+                      mass=columns["mass"], radius=columns["radius"], color=columns["color"])
+        bodies.names.update(state["names"])
+        self.object_id_counter = state["object_id_counter"]
+
+        self.set_force_engine(state["force_engine"])
+        self.set_integrator(state["integrator"])
+        self.integrator.restore(state["integrator_state"], self)
+        if state["accelerations"] is not None:
+            self.accelerations = state["accelerations"].copy()
+            self._accelerations_version = bodies.version
+        self.max_velocity = state["max_velocity"]
+        self.max_acceleration = state["max_acceleration"]
+        self.trails.clear()
+
+    def kick(self, dt, accelerations):
+        """Advance velocities by accelerations * dt."""
+        vx, vy = self.objects.vx, self.objects.vy
+        vx += accelerations[:, 0] * dt
+        vy += accelerations[:, 1] * dt
+        self.max_velocity = np.max(np.sqrt(vx**2 + vy**2)) if vx.size else 0
+
+    def drift(self, dt):
+        """Advance positions by velocities * dt."""
+        x, y = self.objects.x, self.objects.y
+        x += self.objects.vx * dt
+        y += self.objects.vy * dt
+        self.invalidate_accelerations()
 
     def update_object_velocities(self, effective_time_delta):
         """Update velocities of objects based on gravitational forces."""
-
-        # Cache object count
-        n = len(self.objects)
-        if n == 0:
+        if len(self.objects) == 0:
             return
+        self.kick(effective_time_delta, self.compute_accelerations())
 
-        # Cache object positions and masses
-        self._cached_positions = np.array([[obj.x, obj.y] for obj in self.objects])
-        self._cached_velocities = np.array([[obj.vx, obj.vy] for obj in self.objects])
-        self._cached_masses = np.array([obj.mass for obj in self.objects])
-        
-        accelerations = np.zeros((n, 2)) # Initialize accelerations
-        self.max_acceleration = 0
- 
-        for i in range(n):
-            r_vectors = self._cached_positions - self._cached_positions[i]
-            distances = np.linalg.norm(r_vectors, axis=1)
-
-            # Clip distances to avoid extreme acceleration (at or below object radii)
-            clipped_distances = np.maximum(
-                distances,
-                self.objects[i].radius + np.array([o.radius for o in self.objects])
-            )
-
-            mask = distances > 0  # exclude self-interaction
-
-            strengths = np.zeros(n)
-            strengths[mask] = G * self._cached_masses[mask] / (clipped_distances[mask] ** 2)
-
-            directions = np.zeros_like(r_vectors)
-            directions[mask] = r_vectors[mask] / distances[mask][:, np.newaxis]
-
-            acceleration = (strengths[:, np.newaxis] * directions).sum(axis=0)
-            accelerations[i] = acceleration
-            self.max_acceleration = max(self.max_acceleration, np.linalg.norm(acceleration))
+    def update_object_positions(self, effective_time_delta):
+        self.drift(effective_time_delta)
+        self.resolve_collisions()
+
+    def resolve_collisions(self):
+        """Apply the restitution impulse and overlap correction to every pair of touching bodies."""
+        bodies = self.objects
+        x, y = bodies.x, bodies.y
+        vx, vy = bodies.vx, bodies.vy
+        masses, radii = bodies.mass, bodies.radius
+
+        # Broadphase: only touching pairs come back, usually none
+        self.profiler.start("collisions")
+        first, second = overlap_pairs(x, y, radii)
+        if first.size == 0:
+            self.profiler.stop("collisions")
+            return
+        order = np.lexsort((second, first))
+        self.invalidate_accelerations()
 
-        new_velocities = self._cached_velocities + accelerations * effective_time_delta # Store new velocities
-        self.max_velocity = np.max(np.linalg.norm(new_velocities, axis=1))
+        if kernels.COMPILED:
+            kernels.resolve_contacts(first[order], second[order], x, y, vx, vy, masses, radii,
+                                     COEFFICIENT_OF_RESTITUTION)
+            self.profiler.stop("collisions")
+            return
 
-        # Update object velocities
-        for i, obj in enumerate(self.objects):
-            obj.vx, obj.vy = new_velocities[i]
-
-    def update_object_positions(self, effective_time_delta):
-        for i, obj in enumerate(self.objects):
-            obj.x += obj.vx * effective_time_delta
-            obj.y += obj.vy * effective_time_delta
-
-            for j, other in enumerate(self.objects):
-                if i != j:
-                    dx = obj.x - other.x
-                    dy = obj.y - other.y
-                    distance = (dx**2 + dy**2)**0.5
-
-                    # Check for collision
-                    if distance <= (obj.radius + other.radius):
-                        nx, ny = dx / distance, dy / distance # Normalize the normal vector
-                        # Calculate relative velocity
-                        dvx = obj.vx - other.vx
-                        dvy = obj.vy - other.vy
-                        relative_v = dvx * nx + dvy * ny
-                        # If they are moving apart, skip collision response
-                        if relative_v > 0:
-                            continue
-                        m1, m2 = obj.mass, other.mass
-                        cor = COEFFICIENT_OF_RESTITUTION
-                        impulse = -(1 + cor) * relative_v / (1/m1 + 1/m2) # Calculate elastic collision impulse
-                        # Update velocities based on impulse
-                        obj.vx += (impulse * nx) / m1
-                        obj.vy += (impulse * ny) / m1
-                        other.vx -= (impulse * nx) / m2
-                        other.vy -= (impulse * ny) / m2
-                        # Adjust positions to prevent overlap and ensure they are separated
-                        overlap = obj.radius + other.radius - distance 
-                        correction_x = nx * overlap / 2
-                        correction_y = ny * overlap / 2
-                        obj.x += correction_x
-                        obj.y += correction_y
-                        other.x -= correction_x
-                        other.y -= correction_y
+        for i, j in zip(first[order].tolist(), second[order].tolist()):
+            dx = x[i] - x[j]
+            dy = y[i] - y[j]
+            distance = (dx**2 + dy**2)**0.5
+
+            # Earlier responses this step may already have separated the pair
+            if distance == 0 or distance > (radii[i] + radii[j]):
+                continue
+
+            nx, ny = dx / distance, dy / distance # Normalize the normal vector
+            # Calculate relative velocity
+            dvx = vx[i] - vx[j]
+            dvy = vy[i] - vy[j]
+            relative_v = dvx * nx + dvy * ny
+            # If they are moving apart, skip collision response
+            if relative_v > 0:
+                continue
+            m1, m2 = masses[i], masses[j]
+            cor = COEFFICIENT_OF_RESTITUTION
+            impulse = -(1 + cor) * relative_v / (1/m1 + 1/m2) # Calculate elastic collision impulse
+            # Update velocities based on impulse
+            vx[i] += (impulse * nx) / m1
+            vy[i] += (impulse * ny) / m1
+            vx[j] -= (impulse * nx) / m2
+            vy[j] -= (impulse * ny) / m2
+            # Adjust positions to prevent overlap and ensure they are separated
+            overlap = radii[i] + radii[j] - distance 
+            correction_x = nx * overlap / 2
+            correction_y = ny * overlap / 2
+            x[i] += correction_x
+            y[i] += correction_y
+            x[j] -= correction_x
+            y[j] -= correction_y
+        self.profiler.stop("collisions")
 
     def draw(self, surface, font, sim):
         # Draw vector or heatmap field
-        SX, SY, U, V = self.vector_field.generate()
         if self.field_mode == "vector":
+            self.profiler.start("field")
+            SX, SY, U, V = self.vector_field.generate()
+            self.profiler.stop("field")
+            self.profiler.start("field_draw")
             self.draw_vector_field(surface, SX, SY, U, V)
+            self.profiler.stop("field_draw")
         elif self.field_mode == "heatmap":
+            self.profiler.start("field")
+            SX, SY, U, V = self.heatmap_field.generate()
+            self.profiler.stop("field")
+            self.profiler.start("field_draw")
             self.draw_heatmap(surface, SX, SY, U, V)
+            self.profiler.stop("field_draw")
 
         # Draw objects with trails
         self.draw_objects(surface, font, sim)
 
         # Draw scale bar overlay
+        self.profiler.start("scale_bar")
         self.draw_scale_bar(surface, self.camera, font)
+        self.profiler.stop("scale_bar")
 
     def draw_vector_field(self, surface, SX, SY, U, V):
-        # Implement vector drawing using camera.world_to_screen for positions
+        """Rasterize every field arrow (a 1 px line plus a 2x2 head) into the surface's pixels in one pass."""
         max_arrow_length = GRID_SIZE
 
         magnitude = (U**2 + V**2)**0.5 # Calculate magnitude of vectors using pythagorean theorem
         max_magnitude = magnitude.max() if magnitude.size > 0 else 1
 
         scaled_magnitude = np.log1p(magnitude) / np.log1p(max_magnitude + 1e-10) * max_arrow_length
-
-        for i in range(SX.shape[0]):
-            for j in range(SX.shape[1]):
-                grid_point_start = (SX[i,j], SY[i,j])
-                mag = magnitude[i,j]
-                if mag == 0:
-                    pygame.draw.circle(surface, VECTOR_FIELD_COLOR, (int(grid_point_start[0]), int(grid_point_start[1])), 1)
-                    continue
-
-                arrow_length = scaled_magnitude[i,j]
-                dx = U[i,j] / mag * arrow_length
-                dy = V[i,j] / mag * arrow_length
-
-                grid_point_end = (
-                    grid_point_start[0] + dx,
-                    grid_point_start[1] + dy,
-                )
-                pygame.draw.line(surface, VECTOR_FIELD_COLOR,
-                                 (int(grid_point_start[0]), int(grid_point_start[1])),
-                                 (int(grid_point_end[0]), int(grid_point_end[1])), 1)
-                pygame.draw.circle(surface, VECTOR_FIELD_COLOR,
-                                   (int(grid_point_end[0]), int(grid_point_end[1])), 1)
-
-    def draw_heatmap(self, surface, X, Y, U, V):
-        # Implement your heatmap drawing here, using camera.world_to_screen for position
-        pass
-
-    def draw_objects(self, surface, font, sim):
-        visible_objects = [
-            obj for obj in self.objects
-            if 0 <= self.camera.world_to_screen(obj.x, obj.y)[0] <= surface.get_width()
-            and 0 <= self.camera.world_to_screen(obj.x, obj.y)[1] <= surface.get_height()
-        ]
-
-        # Create transparent surface for fading trails
-        trail_surface = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
-
-        max_visible_speed = max(
-            (obj.vx**2 + obj.vy**2)**0.5 for obj in visible_objects
-        ) if visible_objects else 1
-
-        for obj in self.objects:
-            # Draw trails
-            if self.trail_enabled:
-                if not hasattr(obj, "trail"):
-                    obj.trail = []
-
-                # Append current position and elapsed time to trail
-                obj.trail.append((obj.x, obj.y, sim.elapsed_time))
-
-                trimmed_trail = []
-                max_length = 1e30 # Limit trail length to 100 million meters
-                max_age = self.trail_length * sim.speed_multiplier # Limit trail age to 3 seconds
-                total_length = 0.0 # Initialize total length of the trail
-                last_x, last_y = obj.x, obj.y # Initialize last position with current position
-
-                # Trim trail to max length and age
-                for tx, ty, t_time in reversed(obj.trail):
-                    age = sim.elapsed_time - t_time # Calculate age of the trail segment
-
-                    # Calculate distance from last position
-                    dx = last_x - tx 
-                    dy = last_y - ty
-                    segment_length = (dx**2 + dy**2)**0.5
-                    total_length += segment_length # Update total trail length
-                    # If the segment is within the limits, keep it
-                    if age <= max_age and total_length <= max_length:
-                        trimmed_trail.insert(0, (tx, ty, t_time)) # Append to the front of the trail
-                        last_x, last_y = tx, ty
-                    else:
-                        break
-
-                obj.trail = trimmed_trail
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(magnitude > 0, scaled_magnitude / magnitude, 0.0)
+
+        # Arrow end points in whole pixels; zero vectors collapse to a dot at the grid point
+        start_x = SX.astype(np.int64).ravel()
+        start_y = SY.astype(np.int64).ravel()
+        end_x = (SX + U * scale).astype(np.int64).ravel()
+        end_y = (SY + V * scale).astype(np.int64).ravel()
+
+        # Lines: one pixel per step along each arrow's longer axis, with ties rounded towards the start
+        # point as pygame's line drawing does
+        dx, dy = end_x - start_x, end_y - start_y
+        steps = np.maximum(np.abs(dx), np.abs(dy))
+        arrow = np.repeat(np.arange(steps.size), steps + 1)
+        first_pixel = np.cumsum(steps + 1) - (steps + 1)
+        k = np.arange(arrow.size) - first_pixel[arrow]
+        length = np.maximum(steps, 1)[arrow]
+        line_x = start_x[arrow] + np.sign(dx)[arrow] * np.ceil(np.abs(dx)[arrow] * k / length - 0.5).astype(np.int64)
+        line_y = start_y[arrow] + np.sign(dy)[arrow] * np.ceil(np.abs(dy)[arrow] * k / length - 0.5).astype(np.int64)
+
+        # Heads: the 2x2 block pygame draws for a circle of radius 1
+        head_x = (end_x[:, None] + np.array([-1, 0, -1, 0])).ravel()
+        head_y = (end_y[:, None] + np.array([-1, -1, 0, 0])).ravel()
+
+        px = np.concatenate((line_x, head_x))
+        py = np.concatenate((line_y, head_y))
+        width, height = surface.get_size()
+        inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+
+        pixels = pygame.surfarray.pixels2d(surface)
+        pixels[px[inside], py[inside]] = surface.map_rgb(VECTOR_FIELD_COLOR)
+        del pixels # Unlock the surface
+
+    def draw_heatmap(self, surface, SX, SY, U, V):
+        """Draw log10 |g| through the colormap, one smoothly scaled cell per lattice point."""
+        if U.size == 0:
+            return
+        cell = HEATMAP_CELL_SIZE
+
+        # The field sampler hands back the very same arrays while its cache is valid
+        if self._heatmap_cache is None or self._heatmap_cache[0] is not U:
+            magnitude = (U**2 + V**2)**0.5
+            nonzero = magnitude > 0
+            log_magnitude = np.log10(magnitude, out=np.zeros_like(magnitude), where=nonzero)
+            if nonzero.any():
+                low, high = log_magnitude[nonzero].min(), log_magnitude[nonzero].max()
             else:
-                obj.trail = []
-
-            # Draw trail
-            if len(obj.trail) > 1:
-                for i in range(1, len(obj.trail)):
-                    start_pos = self.camera.world_to_screen(obj.trail[i - 1][0], obj.trail[i - 1][1])
-                    end_pos = self.camera.world_to_screen(obj.trail[i][0], obj.trail[i][1])
-                    alpha = int(255 * i / len(obj.trail))
-                    color = (*obj.color, alpha)
-                    pygame.draw.line(trail_surface, color, start_pos, end_pos, 2)
-
-            # Draw object circle
-            sx, sy = self.camera.world_to_screen(obj.x, obj.y)
-            screen_radius = max(1, int(obj.radius * self.camera.pixels_per_meter))
-            pygame.draw.circle(surface, obj.color, (sx, sy), screen_radius)
-
-            # Draw label
-            label = f"{obj.id}"
-            if getattr(obj, "name", None):
-                label += f" ({obj.name})"
-            label_surf = font.render(label, True, (255,255,255))
-            surface.blit(label_surf, (sx + screen_radius + 5, sy - 10))
+                low, high = 0.0, 0.0
+            normalized = np.where(nonzero, (log_magnitude - low) / max(high - low, 1e-12), 0.0)
+            index = (np.clip(normalized, 0, 1) * (len(self.heatmap_lut) - 1)).astype(np.intp)
 
-            # Draw velocity vector if enabled
-            if self.vectors_enabled:
-                speed = (obj.vx**2 + obj.vy**2)**0.5
-                if speed > 0:
+            rows, cols = U.shape
+            raster = pygame.surfarray.make_surface(self.heatmap_lut[index].transpose(1, 0, 2))
+            self._heatmap_cache = (U, pygame.transform.smoothscale(raster, (cols * cell, rows * cell)))
 
-                    distance_m = speed * sim.speed_multiplier * 0.8
+        # Each lattice point sits at the centre of its cell; keep the raster inside the simulation area
+        previous_clip = surface.get_clip()
+        surface.set_clip(pygame.Rect(SIDEBAR_WIDTH, 0, WINDOW_WIDTH - 2 * SIDEBAR_WIDTH, WINDOW_HEIGHT))
+        surface.blit(self._heatmap_cache[1], (SX[0, 0] - cell / 2, SY[0, 0] - cell / 2))
+        surface.set_clip(previous_clip)
 
-                    length_pixels = distance_m * self.camera.pixels_per_meter
-
-                    length_pixels = min(150, length_pixels) # Limit max vector length
-
-                    vx_unit = obj.vx / speed
-                    vy_unit = obj.vy / speed
+    def draw_objects(self, surface, font, sim):
+        render_x, render_y = self.render_positions()
+        bodies = self.objects
+        camera = self.camera
+        width, height = surface.get_size()
+
+        self.profiler.start("trails")
+        trail_surface = self.draw_trails(surface.get_size(), sim, render_x, render_y)
+        self.profiler.stop("trails")
+
+        self.profiler.start("bodies")
+        # Cull in world space; the margin keeps labels and velocity vectors of bodies just off screen
+        visible = np.nonzero(camera.in_view(render_x, render_y, bodies.radius, width, height, VIEW_CULL_MARGIN_PX))[0]
+        # Level of detail: bodies smaller than the threshold on screen become single splatted pixels
+        if self.lod_mode != "off":
+            tiny = bodies.radius[visible] * camera.pixels_per_meter < self.lod_threshold
+            if tiny.any():
+                splat_x, splat_y = camera.world_to_screen(render_x[visible[tiny]], render_y[visible[tiny]])
+                splat_points(surface, splat_x.astype(np.int64), splat_y.astype(np.int64),
+                             bodies.color[visible[tiny]], self.lod_mode, self.heatmap_lut)
+                visible = visible[~tiny]
+
+        screen_x, screen_y = camera.world_to_screen(render_x[visible], render_y[visible])
+        screen_radius = np.maximum(1, (bodies.radius[visible] * camera.pixels_per_meter).astype(np.int64))
+
+        # Velocity vector end points, capped at 150 px
+        vx, vy = bodies.vx[visible], bodies.vy[visible]
+        speed = np.sqrt(vx**2 + vy**2)
+        length_pixels = np.minimum(150, speed * sim.speed_multiplier * 0.8 * camera.pixels_per_meter)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            end_x = screen_x + np.where(speed > 0, vx / speed * length_pixels, 0)
+            end_y = screen_y + np.where(speed > 0, vy / speed * length_pixels, 0)
+
+        names = bodies.names
+        for body_id, sx, sy, radius, color, moving, ex, ey in zip(
+                bodies.ids[visible].tolist(), screen_x.tolist(), screen_y.tolist(), screen_radius.tolist(),
+                bodies.color[visible].tolist(), (speed > 0).tolist(), end_x.tolist(), end_y.tolist()):
+            # Draw object circle, from a cached sprite unless it is very large on screen
+            if radius <= SPRITE_CACHE_MAX_RADIUS:
+                color = tuple(color)
+                sprite = self.sprite_cache.get((radius, color), lambda: render_circle_sprite(radius, color))
+                surface.blit(sprite, (int(sx) - radius - 1, int(sy) - radius - 1))
+            else:
+                pygame.draw.circle(surface, color, (sx, sy), radius)
 
-                    vx_screen = vx_unit * length_pixels
-                    vy_screen = vy_unit * length_pixels
+            # Draw label (only rendered again when the text changes)
+            label = f"{body_id}"
+            if names.get(body_id):
+                label += f" ({names[body_id]})"
+            label_surf = self.label_cache.get((label, font, (255,255,255)), lambda: font.render(label, True, (255,255,255)))
+            surface.blit(label_surf, (sx + radius + 5, sy - 10))
 
-                    start = sx, sy  # object's screen position
-                    end = sx + vx_screen, sy + vy_screen
+            # Draw velocity vector if enabled
+            if self.vectors_enabled and moving:
+                pygame.draw.line(surface, VELOCITY_VECTOR_COLOR, (sx, sy), (ex, ey), 2)
+                pygame.draw.circle(surface, VELOCITY_VECTOR_COLOR, (int(ex), int(ey)), 2)
 
-                    pygame.draw.line(surface, VELOCITY_VECTOR_COLOR, start, end, 2)
-                    pygame.draw.circle(surface, VELOCITY_VECTOR_COLOR, (int(end[0]), int(end[1])), 2)
+        self.profiler.stop("bodies")
 
         # Blit trail surface on top of main surface
-        surface.blit(trail_surface, (0, 0))
+        if trail_surface is not None:
+            self.profiler.start("trails")
+            surface.blit(trail_surface, (0, 0))
+            self.profiler.stop("trails")
+
+    def draw_trails(self, size, sim, render_x, render_y):
+        """Record and trim the trails of the bodies in view, then return the trail surface (None while trails are off)."""
+        if not self.trail_enabled:
+            self.trails.clear()
+            return None
+
+        # Only bodies in view keep trails, the selected one first
+        width, height = size
+        tracked = np.nonzero(self.camera.in_view(render_x, render_y, self.objects.radius, width, height, VIEW_CULL_MARGIN_PX))[0]
+        selected = getattr(sim, "selected_object", None)
+        if selected is not None and selected in self.objects:
+            index = self.objects.index_of(selected.id)
+            tracked = np.concatenate([[index], tracked[tracked != index]])
+
+        # Only record a point once a body has moved about a pixel on screen
+        min_distance = TRAIL_MIN_PIXEL_DISTANCE / self.camera.pixels_per_meter
+        self.trails.record(render_x, render_y, sim.elapsed_time, min_distance, tracked)
+        max_age = self.trail_length * sim.speed_multiplier # Trail age limit in simulated seconds
+        self.trails.trim(sim.elapsed_time - max_age)
+
+        # Persistent trails fade to ~1/255 over the trail length
+        elapsed = sim.elapsed_time - self._last_trail_time if self._last_trail_time is not None else 0.0
+        self._last_trail_time = sim.elapsed_time
+        fade = (1 / 255) ** (max(elapsed, 0.0) / max_age) if max_age > 0 else 0.0
+
+        return self.trail_renderer.draw(size, self.trails, render_x, render_y, self.objects.color, fade)
 
     def draw_scale_bar(self, surface, camera, font):
         bar_width = 200
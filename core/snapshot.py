@@ -0,0 +1,134 @@
+import json
+import struct
+import numpy as np
+from core.body_store import BODY_COLUMNS
+from setup.config import SNAPSHOT_ALIGNMENT
+
+# File layout: MAGIC, then a little-endian (format version, header length) pair, then a JSON header
+# padded to SNAPSHOT_ALIGNMENT bytes, then each body column as raw little-endian bytes at the offset the
+# header records for it (each one aligned the same way).
+MAGIC = b"GRAVSNAP"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<II")
+
+# Scene attributes saved as settings, restored by plain assignment
+SCENE_SETTINGS = ("field_mode", "trail_enabled", "trail_length", "vectors_enabled", "lod_mode", "lod_threshold",
+                  "field_theta")
+
+
+def align_offset(offset):
+    """Round a file offset up to the next SNAPSHOT_ALIGNMENT boundary."""
+    return -(-offset // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+
+
+def camera_state(camera):
+    """The camera fields saved in snapshot and recording headers."""
+    return {key: float(getattr(camera, key)) for key in ("x_offset", "y_offset", "zoom", "base_pixels_per_meter")}
+
+
+def write_header(f, magic, preamble, version, header, key, columns, end_key=None, preamble_tail=()):
+    """
+    Write `magic`, the preamble (version, header length, *preamble_tail) and the JSON `header` to `f`,
+    then each of `columns` (name -> array) at an aligned offset recorded in header[key]. With `end_key`,
+    the aligned offset past the last column is recorded in the header under that name too.
+    """
+    # Offsets depend on the header length, which depends on the offsets' digits: settle it in two passes
+    header_length = 0
+    for _ in range(2):
+        offset = align_offset(len(magic) + preamble.size + header_length)
+        for column, values in columns.items():
+            header[key][column] = {"dtype": values.dtype.str, "shape": list(values.shape), "offset": offset}
+            offset = align_offset(offset + values.nbytes)
+        if end_key is not None:
+            header[end_key] = offset
+        encoded = json.dumps(header).encode("utf-8")
+        header_length = len(encoded)
+
+    f.write(magic)
+    f.write(preamble.pack(version, header_length, *preamble_tail))
+    f.write(encoded)
+    for column, values in columns.items():
+        f.seek(header[key][column]["offset"])
+        f.write(values)
+
+
+def save_snapshot(path, scene, elapsed_time=0.0, **extra):
+    """
+    Write the scene's bodies, camera and display/solver settings to `path`.
+
+    Keyword arguments are stored alongside the settings (e.g. the GUI's speed multiplier) and come back
+    in the header returned by read_snapshot / load_snapshot.
+    """
+    bodies = scene.objects
+    columns = {column: np.ascontiguousarray(bodies.column(column), dtype=np.dtype(dtype).newbyteorder("<"))
+               for column, (shape, dtype) in BODY_COLUMNS.items()}
+
+    header = {
+        "count": len(bodies),
+        "elapsed_time": float(elapsed_time),
+        "object_id_counter": int(scene.object_id_counter),
+        "camera": camera_state(scene.camera),
+        "settings": {"force_engine": scene.force_engine.name, "integrator": scene.integrator.name,
+                     "trail_render_mode": scene.trail_renderer.mode,
+                     **{key: getattr(scene, key) for key in SCENE_SETTINGS}, **extra},
+        "names": [[int(body_id), name] for body_id, name in bodies.names.items()],
+        "arrays": {},
+    }
+    with open(path, "wb") as f:
+        write_header(f, MAGIC, _PREAMBLE, FORMAT_VERSION, header, "arrays", columns)
+    return path
+
+
+def read_snapshot(path):
+    """
+    Open a snapshot without loading it: returns (header, arrays).
+
+    `arrays` maps column names to read-only memory maps of the file, so nothing is read from disk until a
+    column is actually used.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a gravity simulator snapshot")
+        version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path} uses snapshot format {version}; this version reads up to {FORMAT_VERSION}")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+
+    arrays = {}
+    for column, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if shape[0] == 0:
+            arrays[column] = np.zeros(shape, dtype=spec["dtype"])
+        else:
+            arrays[column] = np.memmap(path, dtype=spec["dtype"], mode="r", offset=spec["offset"], shape=shape)
+    return header, arrays
+
+
+def load_snapshot(path, scene):
+    """Replace the scene's bodies, camera and settings with those saved in `path`; returns the header."""
+    header, arrays = read_snapshot(path)
+
+    bodies = scene.objects
+    bodies.clear()
+    bodies.extend(arrays["id"], x=arrays["x"], y=arrays["y"], vx=arrays["vx"], vy=arrays["vy"],
+                  mass=arrays["mass"], radius=arrays["radius"], color=arrays["color"])
+    bodies.names.update((body_id, name) for body_id, name in header["names"])
+    scene.object_id_counter = header["object_id_counter"]
+
+    for key, value in header["camera"].items():
+        setattr(scene.camera, key, value)
+
+    settings = header["settings"]
+    if settings.get("force_engine") != scene.force_engine.name:
+        scene.set_force_engine(settings["force_engine"])
+    if settings.get("integrator") != scene.integrator.name:
+        scene.set_integrator(settings["integrator"])
+    scene.trail_renderer.mode = settings.get("trail_render_mode", scene.trail_renderer.mode)
+    for key in SCENE_SETTINGS:
+        if key in settings:
+            setattr(scene, key, settings[key])
+
+    # Trails belong to the scene being replaced
+    scene.trails.clear()
+    scene.invalidate_accelerations()
+    return header
@@ -0,0 +1,191 @@
+import numpy as np
+
+# Cell coordinates are clamped to this many cells per axis so combined keys always fit in int64
+MAX_CELLS_PER_AXIS = 2**30
+
+# Upper bound on grid cells a single body may span per axis when sizing collision cells
+MAX_CELLS_PER_BODY_AXIS = 32
+
+# Half of the 3x3 neighbourhood: each unordered pair of neighbouring cells is visited exactly once
+HALF_STENCIL = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+# The whole 3x3 neighbourhood, for pairs seen from one side only
+FULL_STENCIL = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
+
+def cell_coordinates(x, y, cell_size):
+    """Integer grid cell of each point, relative to the lower-left corner of the point set."""
+    cx = np.minimum((x - x.min()) / cell_size, MAX_CELLS_PER_AXIS).astype(np.int64)
+    cy = np.minimum((y - y.min()) / cell_size, MAX_CELLS_PER_AXIS).astype(np.int64)
+    return cx, cy
+
+
+def close_pairs(x, y, cutoff):
+    """
+    All unordered index pairs (i, j), i < j, whose separation is below `cutoff`.
+
+    Points are binned into a uniform grid with cell size `cutoff`, keyed by a single integer per cell,
+    so only points in the same or adjacent cells are compared.
+    """
+    pairs = list(close_pair_chunks(x, y, cutoff, max_pairs=None))
+    if not pairs:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate([i for i, _ in pairs]), np.concatenate([j for _, j in pairs])
+
+
+def close_pair_chunks(x, y, cutoff, max_pairs, targets=None):
+    """
+    Close pairs like close_pairs(), yielded as (i, j) chunks of about `max_pairs` candidates at a time.
+
+    The chunks walk the grid cell by cell, so memory stays bounded however many pairs there are in total
+    (a single body's candidates are never split). With `targets`, only pairs involving a target are
+    produced, oriented so i is the target and j any other body within the cutoff; a pair of two targets
+    then appears once from each side. `max_pairs=None` yields everything as one chunk.
+    """
+    n = x.shape[0]
+    if n < 2 or cutoff <= 0:
+        return
+
+    cx, cy = cell_coordinates(x, y, cutoff)
+    stencil = HALF_STENCIL if targets is None else FULL_STENCIL
+    for i, j in _neighbour_chunks(cx, cy, stencil, max_pairs, targets):
+        dx = x[i] - x[j]
+        dy = y[i] - y[j]
+        close = dx * dx + dy * dy < cutoff * cutoff
+        if targets is None:
+            yield np.minimum(i, j)[close], np.maximum(i, j)[close]
+        else:
+            yield i[close], j[close]
+
+
+def collision_cell_size(radii):
+    """
+    Grid cell size for the collision broadphase.
+
+    Sized to the 90th-percentile body diameter so typical bodies touch at most four cells, but never so
+    small that the largest body spans more than MAX_CELLS_PER_BODY_AXIS cells per axis.
+    """
+    diameters = 2 * radii
+    return max(np.percentile(diameters, 90), diameters.max() / MAX_CELLS_PER_BODY_AXIS, 1e-12)
+
+
+def overlap_pairs(x, y, radii, cell_size=None):
+    """
+    All unordered index pairs (i, j), i < j, of touching circles (distance <= sum of radii).
+
+    Each body is inserted into every grid cell its bounding box covers, candidates are the pairs that
+    share a cell, and each candidate is only reported from the cell holding the lower-left corner of the
+    two bounding boxes' intersection so no pair is tested twice.
+    """
+    n = x.shape[0]
+    if n < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    if cell_size is None:
+        cell_size = collision_cell_size(radii)
+
+    x0 = (x - radii).min()
+    y0 = (y - radii).min()
+    cx0 = np.minimum((x - radii - x0) / cell_size, MAX_CELLS_PER_AXIS).astype(np.int64)
+    cy0 = np.minimum((y - radii - y0) / cell_size, MAX_CELLS_PER_AXIS).astype(np.int64)
+    cx1 = np.minimum((x + radii - x0) / cell_size, MAX_CELLS_PER_AXIS).astype(np.int64)
+    cy1 = np.minimum((y + radii - y0) / cell_size, MAX_CELLS_PER_AXIS).astype(np.int64)
+
+    # One entry per (body, covered cell)
+    span_x = cx1 - cx0 + 1
+    cells = span_x * (cy1 - cy0 + 1)
+    body = np.repeat(np.arange(n), cells)
+    local = np.arange(body.shape[0]) - np.repeat(np.cumsum(cells) - cells, cells)
+    cx = cx0[body] + local % span_x[body]
+    cy = cy0[body] + local // span_x[body]
+
+    first, second = _neighbour_candidates(cx, cy, ((0, 0),))
+    i, j = body[first], body[second]
+    reference = (cx[first] == np.maximum(cx0[i], cx0[j])) & (cy[first] == np.maximum(cy0[i], cy0[j]))
+    i, j = i[reference], j[reference]
+
+    dx = x[i] - x[j]
+    dy = y[i] - y[j]
+    reach = radii[i] + radii[j]
+    touching = dx * dx + dy * dy <= reach * reach
+    return np.minimum(i, j)[touching], np.maximum(i, j)[touching]
+
+
+def _neighbour_candidates(cx, cy, stencil):
+    """Candidate pairs between each entry and every entry in the stencil cells around it."""
+    i, j = next(_neighbour_chunks(cx, cy, stencil, max_pairs=None))
+    return np.minimum(i, j), np.maximum(i, j)
+
+
+def _neighbour_chunks(cx, cy, stencil, max_pairs, firsts=None):
+    """
+    Candidate pairs (first, second) between entries and every entry in the stencil cells around them.
+
+    Without `firsts`, every entry is a first and within its own cell only pairs with the entries sorted
+    after it, so a half stencil visits each unordered pair once. With `firsts`, only those entries are
+    centres and they pair with everything else in their cells. Pairs come in chunks of about
+    `max_pairs` (all at once when None), taking the centres in cell order.
+    """
+    n = cx.shape[0]
+    # One spare row per column so the cy - 1 and cy + 1 neighbours never alias another cell
+    width = int(cy.max()) + 2
+    keys = cx * width + cy
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    boundaries = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+    group_start = np.nonzero(boundaries)[0]
+    group_count = np.diff(np.append(group_start, n))
+    unique_keys = sorted_keys[group_start]
+    sorted_cx, sorted_cy = cx[order], cy[order]
+
+    if firsts is None:
+        ranks = np.arange(n)
+    else:
+        rank_of = np.empty(n, dtype=np.int64)
+        rank_of[order] = np.arange(n)
+        ranks = np.sort(rank_of[np.asarray(firsts, dtype=np.int64)])
+        if ranks.shape[0] == 0:
+            return
+
+    def neighbour_range(rank, dx, dy):
+        # Sorted positions [start, start + count) of the entries in the neighbouring cell
+        neighbour_keys = (sorted_cx[rank] + dx) * width + sorted_cy[rank] + dy
+        slot = np.searchsorted(unique_keys, neighbour_keys)
+        slot = np.minimum(slot, unique_keys.shape[0] - 1)
+        found = unique_keys[slot] == neighbour_keys
+        start = group_start[slot]
+        count = np.where(found, group_count[slot], 0)
+        if dx == 0 and dy == 0 and firsts is None:
+            # Same cell: only pair with entries sorted after this one
+            count = np.maximum(0, start + count - rank - 1)
+            start = rank + 1
+        return start, count
+
+    if max_pairs is None:
+        bounds = [0, ranks.shape[0]]
+    else:
+        totals = sum(neighbour_range(ranks, dx, dy)[1] for dx, dy in stencil)
+        cumulative = np.cumsum(totals)
+        cuts = np.searchsorted(cumulative, np.arange(max_pairs, cumulative[-1], max_pairs), side="right")
+        bounds = np.unique(np.concatenate(([0], cuts, [ranks.shape[0]]))).tolist()
+
+    for b0, b1 in zip(bounds[:-1], bounds[1:]):
+        rank = ranks[b0:b1]
+        first_parts, second_parts = [], []
+        for dx, dy in stencil:
+            start, count = neighbour_range(rank, dx, dy)
+            total = count.sum()
+            if total == 0:
+                continue
+            offsets = np.cumsum(count) - count
+            first_parts.append(np.repeat(order[rank], count))
+            second_parts.append(order[np.arange(total) - np.repeat(offsets, count) + np.repeat(start, count)])
+
+        if not first_parts:
+            if max_pairs is None:
+                yield np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+            continue
+        i = np.concatenate(first_parts)
+        j = np.concatenate(second_parts)
+        if firsts is not None:
+            other = i != j
+            i, j = i[other], j[other]
+        yield i, j
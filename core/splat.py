@@ -0,0 +1,60 @@
+import numpy as np
+import pygame
+
+# Ways of drawing sub-pixel bodies, in the order the settings button cycles through them
+SPLAT_MODES = ["additive", "density", "off"]
+
+# Splats whose bounding box has at most this many pixels per body are drawn over the box instead of pixel by pixel
+SPLAT_DENSE_FACTOR = 4
+
+
+def splat_points(surface, px, py, colors, mode, lut):
+    """
+    Draw many tiny bodies as single pixels, in place.
+
+    "additive" sums the colours of every body landing on a pixel (saturating at white), "density" maps
+    the log of the body count per pixel through the colormap `lut`. The splats are added straight onto
+    the surface's pixels: over their bounding box when it is small next to the number of bodies, and
+    otherwise pixel by pixel, so the cost follows the number of bodies rather than how far apart they are.
+    """
+    width, height = surface.get_size()
+    inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    px, py, colors = px[inside], py[inside], colors[inside]
+    if px.size == 0:
+        return
+
+    left, top = int(px.min()), int(py.min())
+    box_height = int(py.max()) - top + 1
+    pixel = (px - left) * box_height + (py - top)
+    cells = (int(px.max()) - left + 1) * box_height
+
+    # Crowded splats are summed over their bounding box, sparse ones over just the occupied pixels
+    dense = cells <= SPLAT_DENSE_FACTOR * pixel.size
+    if dense:
+        index, size = pixel, cells
+    else:
+        occupied, index = np.unique(pixel, return_inverse=True)
+        size = occupied.size
+
+    if mode == "density":
+        counts = np.bincount(index, minlength=size)
+        level = np.log1p(counts) / np.log1p(counts.max())
+        # Lowest colormap entries are near black, so start every occupied pixel a quarter of the way in
+        rgb = np.where((counts > 0)[:, None], lut[((0.25 + 0.75 * level) * (len(lut) - 1)).astype(np.intp)], 0).astype(np.int64)
+        channels = [rgb[:, c] for c in range(3)]
+    else:
+        channels = [np.bincount(index, weights=colors[:, c], minlength=size) for c in range(3)]
+
+    pixels = pygame.surfarray.pixels3d(surface)
+    if dense:
+        target = pixels[left:left + cells // box_height, top:top + box_height]
+    else:
+        ux, uy = np.divmod(occupied, box_height)
+        ux += left
+        uy += top
+    for c, channel in enumerate(channels):
+        if dense:
+            target[..., c] = np.minimum(target[..., c] + channel.reshape(target.shape[:2]), 255)
+        else:
+            pixels[ux, uy, c] = np.minimum(pixels[ux, uy, c] + channel, 255)
+    del pixels # Unlock the surface
@@ -0,0 +1,330 @@
+import numpy as np
+import pygame
+from setup.config import TRAIL_CAPACITY, TRAIL_MAX_BODIES, TRAIL_FADE_BANDS
+
+
+class TrailBuffer:
+    """
+    Ring buffers of recent positions for the bodies worth drawing, kept in a side table of trail rows.
+
+    Only bodies passed to `record()` as tracked (those in view, plus the selected one) get a row, up to
+    `max_trails` rows; a body's row is released once it stops being tracked and its trail has aged out,
+    or when the body is removed. The row index lives in a small `trail_slot` store column (-1 for none),
+    so rows follow bodies through swap-removal, while the buffers themselves are sized by the number of
+    trails rather than the number of bodies.
+
+    Each row holds `capacity` (x, y, time) points as float32 offsets from a per-row float64 origin; its
+    trail is the `count` points starting at slot `start`, oldest first. Appending writes one slot
+    (overwriting the oldest point once the row is full), and trimming by age only advances the start
+    slot, located by a binary search on the timestamps of all rows at once. The origin moves to the
+    newest point whenever a row wraps around, so offsets stay as small as the trail itself.
+    """
+
+    def __init__(self, store, capacity=TRAIL_CAPACITY, max_trails=TRAIL_MAX_BODIES):
+        self.store = store
+        self.capacity = capacity
+        self.max_trails = max_trails
+        self._registered = False
+        # Side table of trail rows: point offsets, per-row origin (x, y, time), ring position and whether in use
+        self._x = np.zeros((0, capacity), dtype=np.float32)
+        self._y = np.zeros((0, capacity), dtype=np.float32)
+        self._t = np.zeros((0, capacity), dtype=np.float32)
+        self._origin = np.zeros((0, 3))
+        self._start = np.zeros(0, dtype=np.int64)
+        self._count = np.zeros(0, dtype=np.int64)
+        self._used = np.zeros(0, dtype=bool)
+
+    def _grow(self, rows):
+        """Enlarge the side table to `rows` trail rows, keeping the existing ones."""
+        for name in ("_x", "_y", "_t", "_origin", "_start", "_count", "_used"):
+            array = getattr(self, name)
+            grown = np.zeros((rows, *array.shape[1:]), dtype=array.dtype)
+            grown[:array.shape[0]] = array
+            setattr(self, name, grown)
+
+    def _ensure_columns(self):
+        if self._registered:
+            return
+        self.store.register_column("trail_slot", (), np.int32, fill=-1)
+        self._registered = True
+
+    def _release_stale(self, tracked):
+        """Free the rows of removed bodies, and of untracked bodies whose trails have aged out."""
+        slot = self.store.column("trail_slot")
+        held = np.zeros(self._used.size, dtype=bool)
+        held[slot[slot >= 0]] = True
+        self._used &= held
+
+        idle = slot >= 0
+        idle[tracked] = False
+        idle[idle] = self._count[slot[idle]] == 0
+        self._used[slot[idle]] = False
+        slot[idle] = -1
+
+    def _assign(self, tracked):
+        """Give rows to tracked bodies that have none, in the order given, while rows are left."""
+        slot = self.store.column("trail_slot")
+        waiting = tracked[slot[tracked] < 0]
+        if waiting.size == 0:
+            return
+        free = np.nonzero(~self._used)[0]
+        if free.size < waiting.size and self._used.size < self.max_trails:
+            rows = self._used.size
+            self._grow(min(self.max_trails, max(2 * rows, rows + waiting.size - free.size)))
+            free = np.nonzero(~self._used)[0]
+        waiting = waiting[:free.size]
+        rows = free[:waiting.size]
+        slot[waiting] = rows
+        self._used[rows] = True
+        self._count[rows] = 0
+        self._start[rows] = 0
+
+    def record(self, x, y, time, min_distance, tracked):
+        """
+        Append (x, y, time) for every tracked body that has moved at least `min_distance` since its last
+        point. `tracked` holds the indices of the bodies to keep trails for, most important first.
+        """
+        store = self.store
+        if len(store) == 0:
+            return
+        self._ensure_columns()
+        tracked = np.asarray(tracked, dtype=np.int64)
+        self._release_stale(tracked)
+        self._assign(tracked)
+
+        bodies = tracked[store.column("trail_slot")[tracked] >= 0]
+        rows = store.column("trail_slot")[bodies].astype(np.int64)
+        start, count, origin = self._start[rows], self._count[rows], self._origin[rows]
+        last = (start + count - 1) % self.capacity
+        moved = ((x[bodies] - origin[:, 0] - self._x[rows, last]) ** 2
+                 + (y[bodies] - origin[:, 1] - self._y[rows, last]) ** 2 >= min_distance ** 2)
+        append = (count == 0) | moved
+        bodies, rows, start, count = bodies[append], rows[append], start[append], count[append]
+        if rows.size == 0:
+            return
+        slots = (start + count) % self.capacity
+
+        # Rows that are empty or wrap around take the new point as their origin
+        anchor = (count == 0) | (slots == 0)
+        new_origin = np.column_stack([x[bodies[anchor]], y[bodies[anchor]], np.full(anchor.sum(), time)])
+        shift = self._origin[rows[anchor]] - new_origin
+        for column, values in enumerate((self._x, self._y, self._t)):
+            values[rows[anchor]] = values[rows[anchor]] + shift[:, column, None]
+        self._origin[rows[anchor]] = new_origin
+
+        origin = self._origin[rows]
+        self._x[rows, slots] = x[bodies] - origin[:, 0]
+        self._y[rows, slots] = y[bodies] - origin[:, 1]
+        self._t[rows, slots] = time - origin[:, 2]
+
+        # A full row drops its oldest point to make room
+        full = count == self.capacity
+        self._start[rows[full]] = (start[full] + 1) % self.capacity
+        self._count[rows[~full]] += 1
+
+    def trim(self, min_time):
+        """Drop every point recorded before `min_time`."""
+        rows = np.nonzero(self._used)[0]
+        if rows.size == 0:
+            return
+        start, count = self._start[rows], self._count[rows]
+        limit = min_time - self._origin[rows, 2]
+
+        # Vectorized bisection for the first point with time >= min_time (timestamps rise along a row)
+        low = np.zeros_like(count)
+        high = count.copy()
+        while True:
+            searching = low < high
+            if not searching.any():
+                break
+            mid = (low + high) // 2
+            too_old = self._t[rows, (start + mid) % self.capacity] < limit
+            low = np.where(searching & too_old, mid + 1, low)
+            high = np.where(searching & ~too_old, mid, high)
+
+        self._start[rows] = (start + low) % self.capacity
+        self._count[rows] = count - low
+
+    def clear(self):
+        self._used[:] = False
+        self._count[:] = 0
+        if self._registered:
+            self.store.column("trail_slot")[:] = -1
+
+    def counts(self):
+        """Number of stored points per body."""
+        if not self._registered or self._count.size == 0:
+            return np.zeros(len(self.store), dtype=np.int64)
+        slot = self.store.column("trail_slot")
+        return np.where(slot >= 0, self._count[slot], 0)
+
+    def gather(self, rows):
+        """
+        Trails of the bodies at `rows` flattened into single x and y arrays, oldest point first.
+
+        Returns (x, y, counts); body k's points are the counts[k] entries following those of body k - 1.
+        """
+        counts = self.counts()[rows]
+        trail = np.repeat(self.store.column("trail_slot")[rows].astype(np.int64), counts)
+        offsets = np.arange(trail.size) - np.repeat(np.cumsum(counts) - counts, counts)
+        slots = (self._start[trail] + offsets) % self.capacity
+        return self._x[trail, slots] + self._origin[trail, 0], self._y[trail, slots] + self._origin[trail, 1], counts
+
+    def points(self, index):
+        """x, y and time arrays of one body's trail, oldest first."""
+        row = int(self.store.column("trail_slot")[index]) if self._registered else -1
+        if row < 0:
+            return np.zeros(0), np.zeros(0), np.zeros(0)
+        slots = (self._start[row] + np.arange(self._count[row])) % self.capacity
+        origin = self._origin[row]
+        return (self._x[row, slots] + origin[0], self._y[row, slots] + origin[1], self._t[row, slots] + origin[2])
+
+
+# Ways of drawing trails, in the order the settings button cycles through them
+TRAIL_MODES = ["polyline", "persistent"]
+
+
+class TrailRenderer:
+    """
+    Draws trails onto one reusable transparent surface.
+
+    "polyline" redraws every trail from the ring buffers each frame: all points go to screen space in a
+    single vectorized transform and each trail is drawn as TRAIL_FADE_BANDS polylines of rising alpha,
+    leaving out the runs of segments that lie off screen.
+    "persistent" keeps the surface between frames, fades it towards transparent and only adds each body's
+    newest segment. A pan scrolls the accumulated image; a zoom or a change to the bodies repaints it once
+    from the ring buffers.
+    """
+
+    def __init__(self, camera, mode=TRAIL_MODES[0]):
+        self.camera = camera
+        self.mode = mode
+        self.surface = None
+        # Camera and bodies the persistent image was drawn for, and where each trail last ended on screen
+        self._camera_state = None
+        self._version = None
+        self._last_screen = None
+
+    def _surface_for(self, size):
+        if self.surface is None or self.surface.get_size() != size:
+            self.surface = pygame.Surface(size, pygame.SRCALPHA)
+            self._camera_state = None
+        return self.surface
+
+    def draw_polylines(self, surface, trails, render_x, render_y, colors):
+        """Draw every stored trail in view, extended to the body's current position, as fading polylines."""
+        rows = np.nonzero(trails.counts())[0]
+        if rows.size == 0:
+            return
+        trail_x, trail_y, counts = trails.gather(rows)
+
+        # Skip trails whose bounding box (including the body) lies outside the view
+        starts = np.cumsum(counts) - counts
+        left, top, right, bottom = self.camera.view_rect(*surface.get_size(), margin_px=2)
+        min_x = np.minimum(np.minimum.reduceat(trail_x, starts), render_x[rows])
+        max_x = np.maximum(np.maximum.reduceat(trail_x, starts), render_x[rows])
+        min_y = np.minimum(np.minimum.reduceat(trail_y, starts), render_y[rows])
+        max_y = np.maximum(np.maximum.reduceat(trail_y, starts), render_y[rows])
+        visible = (max_x >= left) & (min_x <= right) & (max_y >= top) & (min_y <= bottom)
+        if not visible.any():
+            return
+        keep = np.repeat(visible, counts)
+        rows, counts = rows[visible], counts[visible]
+        trail_x, trail_y = trail_x[keep], trail_y[keep]
+
+        screen_x, screen_y = self.camera.world_to_screen(trail_x, trail_y)
+        end_x, end_y = self.camera.world_to_screen(render_x[rows], render_y[rows])
+        # The trail always reaches the body, even between recorded points
+        last = np.cumsum(counts) - 1
+        extend = (screen_x[last] != end_x) | (screen_y[last] != end_y)
+        screen_x = np.insert(screen_x, last[extend] + 1, end_x[extend])
+        screen_y = np.insert(screen_y, last[extend] + 1, end_y[extend])
+        counts = counts + extend
+
+        # A segment is in view if its bounding box overlaps the screen; runs of such segments are found
+        # for all trails at once (the last point of a trail starts no segment, which splits the runs)
+        width, height = surface.get_size()
+        margin = 2
+        next_x, next_y = np.roll(screen_x, -1), np.roll(screen_y, -1)
+        segment_visible = ((np.maximum(screen_x, next_x) >= -margin) & (np.minimum(screen_x, next_x) <= width + margin)
+                           & (np.maximum(screen_y, next_y) >= -margin) & (np.minimum(screen_y, next_y) <= height + margin))
+        starts = np.cumsum(counts) - counts
+        segment_visible[starts + counts - 1] = False
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], segment_visible, [False])).astype(np.int8)))
+        run_starts, run_ends = edges[::2], edges[1::2]
+        first_run = np.searchsorted(run_starts, starts).tolist()
+        run_starts, run_ends = run_starts.tolist(), run_ends.tolist()
+
+        points = list(zip(screen_x.tolist(), screen_y.tolist()))
+        row_colors = [tuple(color) for color in colors[rows].tolist()]
+        first_run.append(len(run_starts))
+
+        for k, (first, count) in enumerate(zip(starts.tolist(), counts.tolist())):
+            segments = count - 1
+            runs = list(zip(run_starts[first_run[k]:first_run[k + 1]], run_ends[first_run[k]:first_run[k + 1]]))
+            if not runs:
+                continue
+
+            # Split the segments into bands, each drawn with the alpha of its middle segment and only
+            # along the runs of segments in view
+            bands = min(TRAIL_FADE_BANDS, segments)
+            for band in range(bands):
+                begin = first + band * segments // bands
+                end = first + (band + 1) * segments // bands
+                color = (*row_colors[k], int(255 * (begin + end + 1 - 2 * first) / 2 / count))
+                for run_start, run_end in runs:
+                    low, high = max(run_start, begin), min(run_end, end)
+                    if low < high:
+                        pygame.draw.lines(surface, color, False, points[low:high + 1], 2)
+
+    def draw(self, size, trails, render_x, render_y, colors, fade):
+        """
+        Bring the trail surface up to date and return it.
+
+        `fade` is the fraction of alpha the persistent image keeps this frame.
+        """
+        surface = self._surface_for(size)
+        if self.mode != "persistent":
+            surface.fill((0, 0, 0, 0))
+            self.draw_polylines(surface, trails, render_x, render_y, colors)
+            self._camera_state = None
+            return surface
+
+        camera = self.camera
+        camera_state = (camera.pixels_per_meter, camera.x_offset, camera.y_offset)
+        end_x, end_y = camera.world_to_screen(render_x, render_y)
+        previous = self._camera_state
+        if previous is not None:
+            shift_x, shift_y = camera_state[1] - previous[1], camera_state[2] - previous[2]
+        # The image can only be reused for the same zoom and bodies, after a whole-pixel pan at most
+        if (previous is None or previous[0] != camera_state[0] or self._version != trails.store.version
+                or shift_x != round(shift_x) or shift_y != round(shift_y)):
+            surface.fill((0, 0, 0, 0))
+            self.draw_polylines(surface, trails, render_x, render_y, colors)
+        else:
+            width, height = size
+            if shift_x or shift_y:
+                dx, dy = int(shift_x), int(shift_y)
+                surface.scroll(dx, dy)
+                # Scrolling leaves the old pixels in the strips it uncovers
+                if dx:
+                    surface.fill((0, 0, 0, 0), pygame.Rect(0 if dx > 0 else width + dx, 0, abs(dx), height))
+                if dy:
+                    surface.fill((0, 0, 0, 0), pygame.Rect(0, 0 if dy > 0 else height + dy, width, abs(dy)))
+            if fade < 1:
+                surface.fill((255, 255, 255, int(255 * fade)), special_flags=pygame.BLEND_RGBA_MULT)
+            # Newest segment of each body, drawn opaque on top of the faded history
+            last_x, last_y = self._last_screen
+            last_x = last_x + shift_x
+            last_y = last_y + shift_y
+            moved = np.nonzero(((last_x != end_x) | (last_y != end_y))
+                               & (np.maximum(last_x, end_x) >= 0) & (np.minimum(last_x, end_x) <= width)
+                               & (np.maximum(last_y, end_y) >= 0) & (np.minimum(last_y, end_y) <= height))[0]
+            for start, end, color in zip(zip(last_x[moved].tolist(), last_y[moved].tolist()),
+                                         zip(end_x[moved].tolist(), end_y[moved].tolist()), colors[moved].tolist()):
+                pygame.draw.line(surface, (*color, 255), start, end, 2)
+
+        self._camera_state = camera_state
+        self._version = trails.store.version
+        self._last_screen = (end_x, end_y)
+        return surface
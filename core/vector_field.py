@@ -1,34 +1,124 @@
 import numpy as np
-from setup.config import G, SIDEBAR_WIDTH, WINDOW_WIDTH, SIDEBAR_WIDTH, WINDOW_HEIGHT, GRID_SIZE
+from core.barnes_hut import QuadTree
+from core.force_engines import direct_accelerations
+from setup.config import SIDEBAR_WIDTH, WINDOW_WIDTH, SIDEBAR_WIDTH, WINDOW_HEIGHT, GRID_SIZE, FIELD_CACHE_TOLERANCE_PX, FIELD_TREE_MIN_BODIES
 
 class VectorField:
-    def __init__(self, grid_spacing_px, scene, camera):
+    """
+    Gravitational field sampled on a lattice anchored in world space.
+
+    Lattice point (i, j) sits at world position (i, j) * grid spacing, so a pan only slides the lattice
+    across the screen. The last result is cached: while the zoom is unchanged and no body has been added,
+    removed, edited or moved by more than FIELD_CACHE_TOLERANCE_PX on screen, `generate` reuses it and only
+    evaluates lattice points newly exposed by a pan.
+
+    Scenes with at least FIELD_TREE_MIN_BODIES bodies are sampled through a Barnes–Hut quadtree with the
+    scene's opening angle `field_theta` (the error tolerance), so the cost per lattice point grows only
+    with log(bodies); smaller scenes are summed exactly. Both treat a lattice point like a body of radius
+    zero under the force engines' rule (strength clipped at the body's radius, direction from the true
+    separation), so the field doesn't jump when a scene crosses the threshold.
+    """
+
+    def __init__(self, grid_spacing_px, scene, camera, margin_px=0):
         self.grid_spacing_px = grid_spacing_px
+        # Extra screen border sampled around the simulation area
+        self.margin_px = margin_px
         self.scene = scene
         self.camera = camera
+        # Number of lattice points evaluated by the last generate() call
+        self.last_computed = 0
+        self.invalidate()
 
-    def generate(self):
-        screen_x = np.arange(SIDEBAR_WIDTH, WINDOW_WIDTH - SIDEBAR_WIDTH, self.grid_spacing_px)
-        screen_y = np.arange(0, WINDOW_HEIGHT, self.grid_spacing_px)
-        SX, SY = np.meshgrid(screen_x, screen_y)
+    def invalidate(self):
+        """Force the next generate() to recompute every lattice point."""
+        self._cache = None
+        self._tree = None
+
+    def _lattice_range(self, offset, start_px, end_px):
+        """Lattice indices whose screen coordinate lies in [start_px, end_px)."""
+        spacing = self.grid_spacing_px
+        return np.arange(np.ceil((start_px - offset) / spacing), np.ceil((end_px - offset) / spacing))
 
-        # Convert screen to world coordinates
-        X, Y = self.camera.screen_to_world(SX, SY)
-        
+    def _bodies_moved(self, cache):
+        bodies = self.scene.objects
+        if cache["version"] != bodies.version or cache["x"].shape[0] != len(bodies):
+            return True
+        if not len(bodies):
+            return False
+        moved = np.maximum(np.abs(bodies.x - cache["x"]), np.abs(bodies.y - cache["y"])).max()
+        return moved * self.camera.pixels_per_meter > FIELD_CACHE_TOLERANCE_PX
+
+    def field_at(self, X, Y):
+        """Gravitational acceleration (U, V) at world points X, Y (arrays of any shape)."""
         U = np.zeros_like(X, dtype=float)
         V = np.zeros_like(Y, dtype=float)
 
+        if not U.size:
+            return U, V
+
+        bodies = self.scene.objects
+        if len(bodies) >= FIELD_TREE_MIN_BODIES:
+            # Reuse the tree while the cache is valid, so pans don't rebuild it
+            if self._tree is None:
+                self._tree = QuadTree(bodies.x, bodies.y, bodies.mass, bodies.radius)
+            points_x, points_y = X.ravel(), Y.ravel()
+            ax, ay = self._tree.accelerations(points_x, points_y, np.zeros_like(points_x), theta=self.scene.field_theta)
+        else:
+            points_x, points_y = X.ravel().astype(float), Y.ravel().astype(float)
+            ax, ay = direct_accelerations(bodies.x, bodies.y, bodies.mass, bodies.radius,
+                                          points_x, points_y, np.zeros_like(points_x))
+        return ax.reshape(U.shape), ay.reshape(V.shape)
+
+    def generate(self):
+        camera = self.camera
+        pixels_per_meter = camera.pixels_per_meter
+        margin = self.margin_px
+        ix = self._lattice_range(camera.x_offset, SIDEBAR_WIDTH - margin, WINDOW_WIDTH - SIDEBAR_WIDTH + margin)
+        iy = self._lattice_range(camera.y_offset, -margin, WINDOW_HEIGHT + margin)
+        IX, IY = np.meshgrid(ix, iy)
 
-        for obj in self.scene.objects:
-            dx = X - obj.x
-            dy = Y - obj.y
-            distance = np.sqrt(dx**2 + dy**2)
-            distance = np.clip(distance, obj.radius, None)
+        # Screen and world coordinates of the lattice points
+        SX = IX * self.grid_spacing_px + camera.x_offset
+        SY = IY * self.grid_spacing_px + camera.y_offset
+        spacing_m = self.grid_spacing_px / pixels_per_meter
+        X = IX * spacing_m
+        Y = IY * spacing_m
 
-            accel = G * obj.mass / (distance**2)
-            U -= accel * (dx / distance)
-            V -= accel * (dy / distance)
+        cache = self._cache
+        full = (cache is None or cache["pixels_per_meter"] != pixels_per_meter or cache["theta"] != self.scene.field_theta
+                or self._bodies_moved(cache))
+        if full:
+            self._tree = None
+            U, V = self.field_at(X, Y)
+            self.last_computed = U.size
+        elif np.array_equal(ix, cache["ix"]) and np.array_equal(iy, cache["iy"]):
+            # Same lattice points as last time: hand back the cached arrays themselves
+            self.last_computed = 0
+            return SX, SY, cache["U"], cache["V"]
+        else:
+            # Pan only: shift the overlapping block across and evaluate the newly exposed strips
+            U = np.empty_like(X)
+            V = np.empty_like(Y)
+            old_ix, old_iy = cache["ix"], cache["iy"]
+            keep_x = (ix >= old_ix[0]) & (ix <= old_ix[-1]) if old_ix.size else np.zeros(ix.shape, bool)
+            keep_y = (iy >= old_iy[0]) & (iy <= old_iy[-1]) if old_iy.size else np.zeros(iy.shape, bool)
+            if keep_x.any() and keep_y.any():
+                cols = (ix[keep_x] - old_ix[0]).astype(np.intp)
+                rows = (iy[keep_y] - old_iy[0]).astype(np.intp)
+                block = np.ix_(keep_y, keep_x)
+                U[block] = cache["U"][np.ix_(rows, cols)]
+                V[block] = cache["V"][np.ix_(rows, cols)]
+            exposed = ~(keep_y[:, None] & keep_x[None, :])
+            U[exposed], V[exposed] = self.field_at(X[exposed], Y[exposed])
+            self.last_computed = int(exposed.sum())
 
-        vector_magnitude = np.sqrt(U**2 + V**2)
+        bodies = self.scene.objects
+        if full:
+            # Positions are only re-snapshotted on a full recompute, so slow drift still accumulates
+            cached_x, cached_y, version = bodies.x.copy(), bodies.y.copy(), bodies.version
+        else:
+            cached_x, cached_y, version = cache["x"], cache["y"], cache["version"]
+        self._cache = {"pixels_per_meter": pixels_per_meter, "theta": self.scene.field_theta, "ix": ix, "iy": iy, "U": U, "V": V,
+                       "x": cached_x, "y": cached_y, "version": version}
 
-        return SX, SY, U, V
\ No newline at end of file
+        return SX, SY, U, V
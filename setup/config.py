@@ -10,6 +10,8 @@ PADDING = 0
 MARGIN = 10
 LABEL_INPUT_GAP = 500
 VELOCITY_VECTOR_COLOR = (0, 0, 255)
+# The object list shows at most this many bodies (plus the selected one), so huge scenes load quickly
+OBJECT_LIST_MAX_ITEMS = 1000
 
 PANEL_CONFIG = {
     "top": {
@@ -66,4 +68,105 @@ DEFAULT_INPUTS = {
 G = 6.67430e-11  # m³/kg/s² (real-world gravitational constant)
 
 # Coefficient of restitution for object-object collisions
-COEFFICIENT_OF_RESTITUTION = 0.1  # 1.0 means perfectly elastic collision
\ No newline at end of file
+COEFFICIENT_OF_RESTITUTION = 0.1  # 1.0 means perfectly elastic collision
+
+# Gravity solver used by the scene ("direct", "barnes_hut", "particle_mesh" or "parallel")
+FORCE_ENGINE = "direct"
+# Block edge length for the direct-sum kernel; bounds temporaries to FORCE_TILE_SIZE² pairs
+FORCE_TILE_SIZE = 512
+
+# Use the Numba-compiled force and collision kernels when Numba is installed (NumPy otherwise)
+USE_COMPILED_KERNELS = True
+
+# Scene snapshots: default folder, file extension, and byte alignment of the raw arrays in the file
+SNAPSHOT_DIR = "snapshots"
+SNAPSHOT_EXTENSION = ".gsnap"
+SNAPSHOT_ALIGNMENT = 64
+
+# Trajectory recording: folder and extension, physics steps per recorded frame, frame encoding
+# ("float64", "float32" or "delta"), frames per on-disk chunk, and frames buffered for the writer thread
+RECORD_DIR = "recordings"
+RECORDING_EXTENSION = ".gtraj"
+RECORD_EVERY_STEPS = 4
+RECORD_ENCODING = "delta"
+RECORD_CHUNK_FRAMES = 256
+RECORD_QUEUE_FRAMES = 64
+
+# Parallel direct-sum engine: worker processes (0 = one per CPU) and the pair count below which it stays in-process
+PARALLEL_WORKERS = 0
+PARALLEL_MIN_PAIRS = 1_000_000
+
+# Barnes–Hut opening angle: cells narrower than theta × distance are treated as point masses
+BARNES_HUT_THETA = 0.5
+# Maximum number of bodies held by a quadtree leaf before it is split
+BARNES_HUT_LEAF_SIZE = 8
+# Number of target bodies walked through the tree at once (bounds traversal memory)
+BARNES_HUT_BATCH_SIZE = 1024
+
+# Particle-mesh solver: grid cells per side, and whether close pairs get the exact P³M correction
+# (off by default: the close pairs grow as n², e.g. about six minutes per evaluation at a million bodies)
+PM_MESH_SIZE = 256
+PM_SHORT_RANGE = False
+# Gaussian force-split scale in mesh cells, and the short-range cutoff in units of that scale
+PM_SPLIT_CELLS = 1.25
+PM_CUTOFF_SPLITS = 4.5
+# Close pairs the short-range correction handles at once (bounds its temporaries to a few hundred MB)
+PM_PAIR_CHUNK = 2_000_000
+
+# Time integration scheme ("euler", "leapfrog", "verlet", "yoshida4" or "block")
+INTEGRATOR = "euler"
+
+# Block time-stepping: number of power-of-two step levels below the frame step, the accuracy parameter
+# eta (each body steps at most eta times the orbital or crossing time of its tightest pair), and how many
+# of the heaviest bodies are considered as pair partners
+BLOCK_TIMESTEP_LEVELS = 8
+BLOCK_TIMESTEP_ETA = 0.1
+BLOCK_TIMESTEP_PARTNERS = 64
+
+# Fixed physics rate (steps per real second) and the most physics steps run in one rendered frame
+PHYSICS_HZ = 120
+MAX_PHYSICS_SUBSTEPS = 8
+
+# Rewind checkpoints: physics steps between checkpoints, their total memory budget (older ones are thinned
+# out to stay within it), and how far one press of Rewind goes back in real seconds of simulation
+CHECKPOINT_INTERVAL_STEPS = 120
+CHECKPOINT_MEMORY_MB = 256
+REWIND_SECONDS = 5
+
+# Frame timing overlay (F3) and CSV dump (F4): frames of history kept and frame-time histogram bins
+PROFILER_HISTORY_FRAMES = 300
+PROFILER_HISTOGRAM_BINS = 24
+PROFILER_OVERLAY_COLOR = (230, 230, 230)
+
+# The cached vector field is recomputed once any body has moved this many screen pixels
+FIELD_CACHE_TOLERANCE_PX = 0.5
+
+# Vector field sampling: bodies needed before switching to the quadtree, and its opening angle (error tolerance)
+FIELD_TREE_MIN_BODIES = 512
+FIELD_THETA = 0.7
+
+# Heatmap field display: lattice cell size in pixels and the colormap stops for log10 |g| (low to high)
+HEATMAP_CELL_SIZE = 8
+HEATMAP_COLORS = [(0, 0, 4), (40, 11, 84), (101, 21, 110), (159, 42, 99), (212, 72, 66), (245, 125, 21), (250, 193, 39), (252, 255, 164)]
+
+# Trail ring buffers: points kept per body, and the on-screen distance a body must move before a new point is recorded
+TRAIL_CAPACITY = 256
+# Most bodies that keep trails at once (those in view, selected first); each costs TRAIL_CAPACITY * 12 bytes
+TRAIL_MAX_BODIES = 16384
+TRAIL_MIN_PIXEL_DISTANCE = 1.0
+
+# Trail drawing: "polyline" redraws trails every frame, "persistent" fades an accumulated image; alpha bands per polyline
+TRAIL_RENDER_MODE = "polyline"
+TRAIL_FADE_BANDS = 8
+
+# Bodies are drawn while within this many pixels of the screen edge (room for labels and velocity vectors)
+VIEW_CULL_MARGIN_PX = 150
+
+# LRU caches of rendered labels and body sprites; bodies larger than the radius limit (px) are drawn directly
+LABEL_CACHE_SIZE = 4096
+SPRITE_CACHE_SIZE = 1024
+SPRITE_CACHE_MAX_RADIUS = 64
+
+# Level of detail: bodies under LOD_RADIUS_PX screen pixels in radius are splatted as points ("additive", "density" or "off")
+LOD_SPLAT_MODE = "additive"
+LOD_RADIUS_PX = 2
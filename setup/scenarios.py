@@ -0,0 +1,86 @@
+# scenarios.py
+import json
+import numpy as np
+from setup.config import G
+from setup.presets import get_preset_by_name
+
+AU = 1.496e11
+
+
+def _add_body(scene, name="", x=0.0, y=0.0, vx=0.0, vy=0.0, mass=1.0, radius=1.0, color=(200, 50, 50)):
+    scene.objects.add(scene.object_id_counter, x=x, y=y, vx=vx, vy=vy, mass=mass, radius=radius,
+                      color=color, name=name)
+    scene.object_id_counter += 1
+
+
+def _add_preset(scene, preset_name, **state):
+    preset = get_preset_by_name(preset_name)
+    _add_body(scene, name=preset["name"], mass=preset["mass"], radius=preset["radius"],
+              color=preset["color"], **state)
+
+
+def sun_earth_moon(scene, **_):
+    """The Sun at the origin with the Earth and Moon on circular orbits."""
+    _add_preset(scene, "Sun")
+    _add_preset(scene, "Earth", x=AU, vy=29780)
+    _add_preset(scene, "Moon", x=AU + 3.844e8, vy=29780 + 1022)
+
+
+def debris_disk(scene, bodies=1000, seed=0, **_):
+    """A star surrounded by a thin disk of small bodies on near-circular orbits between 1 and 3 AU."""
+    _add_preset(scene, "Sun")
+    sun_mass = get_preset_by_name("Sun")["mass"]
+
+    rng = np.random.default_rng(seed)
+    r = rng.uniform(1 * AU, 3 * AU, bodies)
+    angle = rng.uniform(0, 2 * np.pi, bodies)
+    speed = np.sqrt(G * sun_mass / r) * rng.normal(1, 0.01, bodies)
+
+    ids = np.arange(scene.object_id_counter, scene.object_id_counter + bodies)
+    scene.objects.extend(
+        ids,
+        x=r * np.cos(angle),
+        y=r * np.sin(angle),
+        vx=-speed * np.sin(angle),
+        vy=speed * np.cos(angle),
+        mass=rng.uniform(1e18, 1e21, bodies),
+        radius=rng.uniform(1e5, 1e6, bodies),
+        color=(180, 180, 180),
+    )
+    scene.object_id_counter += bodies
+
+
+SCENARIOS = {
+    "sun_earth_moon": sun_earth_moon,
+    "debris_disk": debris_disk,
+}
+
+
+def get_scenario_names():
+    return list(SCENARIOS.keys())
+
+
+def load_scenario_file(scene, path):
+    """
+    Populate a scene from a JSON scenario file.
+
+    The file holds a "bodies" list of objects with name, x, y, vx, vy, mass, radius and color keys, and
+    optionally "force_engine" and "integrator" names.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if "force_engine" in data:
+        scene.set_force_engine(data["force_engine"])
+    if "integrator" in data:
+        scene.set_integrator(data["integrator"])
+    for body in data.get("bodies", []):
+        _add_body(scene, **{key: tuple(value) if key == "color" else value for key, value in body.items()})
+
+
+def load_scenario(scene, name_or_path, **options):
+    """Populate a scene from a built-in scenario name or a JSON scenario file."""
+    builder = SCENARIOS.get(name_or_path)
+    if builder:
+        builder(scene, **options)
+    else:
+        load_scenario_file(scene, name_or_path)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the project modules the same way the entry scripts do, from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
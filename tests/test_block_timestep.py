@@ -0,0 +1,62 @@
+import numpy as np
+from core.scene import Scene
+from setup.config import G
+from setup.scenarios import load_scenario
+
+DAY = 86400.0
+YEAR = 365 * DAY
+
+
+def _energy(bodies):
+    x, y, m = bodies.x, bodies.y, bodies.mass
+    kinetic = 0.5 * (m * (bodies.vx ** 2 + bodies.vy ** 2)).sum()
+    i, j = np.triu_indices(len(x), 1)
+    potential = -(G * m[i] * m[j] / np.hypot(x[i] - x[j], y[i] - y[j])).sum()
+    return kinetic + potential
+
+
+def _run(integrator, dt, duration=YEAR):
+    """Integrate the Sun/Earth/Moon preset; returns (single-body force evaluations, max relative energy error)."""
+    scene = Scene()
+    load_scenario(scene, "sun_earth_moon")
+    scene.set_integrator(integrator)
+
+    evaluations = 0
+    compute = scene.force_engine.compute_accelerations
+
+    def counted(bodies, targets=None):
+        nonlocal evaluations
+        evaluations += len(bodies) if targets is None else len(targets)
+        return compute(bodies, targets)
+
+    scene.force_engine.compute_accelerations = counted
+    initial = _energy(scene.objects)
+    error = 0.0
+    for _ in range(int(round(duration / dt))):
+        scene.update(dt)
+        error = max(error, abs(_energy(scene.objects) / initial - 1))
+    return evaluations, error
+
+
+def test_block_steps_beat_leapfrog_of_equal_accuracy():
+    evaluations, error = _run("block", DAY)
+    assert error < 1e-8
+
+    # Halve the global leapfrog step until it is at least as accurate
+    divisions = 1
+    while True:
+        leapfrog_evaluations, leapfrog_error = _run("leapfrog", DAY / divisions)
+        if leapfrog_error <= error:
+            break
+        divisions *= 2
+    assert evaluations < 0.5 * leapfrog_evaluations
+
+
+def test_tight_pair_shares_a_level():
+    scene = Scene()
+    load_scenario(scene, "sun_earth_moon")
+    scene.set_integrator("block")
+    scene.update(DAY)
+    sun, earth, moon = scene.integrator._levels
+    assert earth == moon
+    assert sun < earth
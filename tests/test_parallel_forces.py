@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so the shared memory resource tracker's complaints reach our stderr
+RESTART_SCRIPT = textwrap.dedent("""
+    import numpy as np
+    from core.body_store import BodyStore
+    from core.force_engines import direct_accelerations
+    from core.parallel_forces import ParallelDirectEngine
+
+    n = 2000
+    rng = np.random.default_rng(0)
+    store = BodyStore()
+    store.extend(np.arange(n), rng.random(n) * 1e9, rng.random(n) * 1e9, np.zeros(n), np.zeros(n),
+                 rng.uniform(1e20, 1e22, n), np.full(n, 1e3))
+    expected, _ = direct_accelerations(store.x, store.y, store.mass, store.radius, store.x, store.y, store.radius)
+    for _ in range(2):
+        engine = ParallelDirectEngine(workers=4, min_pairs=0)
+        ax, _ = engine.compute_accelerations(store)
+        assert np.allclose(ax, expected, rtol=1e-12, atol=0)
+        engine.close()
+""")
+
+
+def test_pool_restarts_without_resource_tracker_errors():
+    result = subprocess.run([sys.executable, "-c", RESTART_SCRIPT], cwd=ROOT, capture_output=True, text=True,
+                            timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stderr == ""
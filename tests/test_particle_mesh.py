@@ -0,0 +1,74 @@
+import tracemalloc
+from types import SimpleNamespace
+import numpy as np
+from core.body_store import BodyStore
+from core.particle_mesh import ParticleMeshEngine
+from core.scene import FORCE_ENGINES
+from core.spatial_hash import close_pairs, close_pair_chunks
+
+
+def _disk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    r = 1e9 * np.sqrt(rng.random(n))
+    phi = 2 * np.pi * rng.random(n)
+    return SimpleNamespace(x=r * np.cos(phi), y=r * np.sin(phi), mass=rng.uniform(1e20, 1e22, n),
+                           radius=np.full(n, 1e5))
+
+
+def _pair_set(i, j):
+    return set(zip(i.tolist(), j.tolist()))
+
+
+def test_close_pair_chunks_match_close_pairs():
+    bodies = _disk(3000)
+    cutoff = 5e7
+    expected = _pair_set(*close_pairs(bodies.x, bodies.y, cutoff))
+    chunks = list(close_pair_chunks(bodies.x, bodies.y, cutoff, max_pairs=500))
+    assert len(chunks) > 1
+    found = [pair for i, j in chunks for pair in zip(i.tolist(), j.tolist())]
+    assert len(found) == len(expected)
+    assert set(found) == expected
+
+    targets = np.arange(0, 3000, 7)
+    one_sided = _pair_set(*map(np.concatenate, zip(*close_pair_chunks(bodies.x, bodies.y, cutoff, 500, targets))))
+    wanted = {(a, b) for a, b in expected if a in set(targets.tolist())}
+    wanted |= {(b, a) for a, b in expected if b in set(targets.tolist())}
+    assert one_sided == wanted
+
+
+def test_short_range_memory_stays_bounded():
+    n = 60_000
+    bodies = _disk(n)
+    engine = ParticleMeshEngine(short_range=True, pair_chunk=100_000)
+    span = max(np.ptp(bodies.x), np.ptp(bodies.y))
+    cutoff = engine.cutoff_splits * engine.split_cells * span / (engine.mesh_size - 3)
+    pairs = sum(i.size for i, _ in close_pair_chunks(bodies.x, bodies.y, cutoff, 100_000))
+    # Enough close pairs that materializing them all at once would need well over a gigabyte
+    assert pairs > 2_000_000
+
+    tracemalloc.start()
+    engine.compute_accelerations(bodies)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < 150 * 2**20
+
+
+def test_short_range_chunks_and_targets_agree_with_full_pass():
+    bodies = _disk(20_000, seed=1)
+    ax, ay = ParticleMeshEngine(short_range=True, pair_chunk=10**9).compute_accelerations(bodies)
+    chunked = ParticleMeshEngine(short_range=True, pair_chunk=50_000)
+    cx, cy = chunked.compute_accelerations(bodies)
+    scale = np.abs(ax).max()
+    assert np.abs(cx - ax).max() < 1e-12 * scale
+    assert np.abs(cy - ay).max() < 1e-12 * scale
+
+    targets = np.array([19_999, 5, 1234, 7, 15_000])
+    tx, ty = chunked.compute_accelerations(bodies, targets)
+    assert np.abs(tx - ax[targets]).max() < 1e-12 * scale
+    assert np.abs(ty - ay[targets]).max() < 1e-12 * scale
+
+
+def test_every_engine_handles_an_empty_store():
+    for name, engine in FORCE_ENGINES.items():
+        ax, ay = engine().compute_accelerations(BodyStore())
+        assert ax.shape == ay.shape == (0,), name
@@ -1,6 +1,17 @@
+import os
+import time
+import numpy as np
 import pygame
 import pygame_gui
 from setup.config import *
+from core.scene import FORCE_ENGINES, FIELD_MODES
+from core.integrators import INTEGRATORS
+from core.trails import TRAIL_MODES
+from core.splat import SPLAT_MODES
+from core.snapshot import save_snapshot, load_snapshot
+from core.recorder import TrajectoryRecorder, TrajectoryReader
+
+FIELD_MODE_LABELS = {"vector": "Vector", "heatmap": "Heatmap", "none": "Off"}
 
 def format_value(val):
     if val != 0 and (abs(val) >= 1e4 or abs(val) < 1e-3):
@@ -17,14 +28,15 @@ def handle_left_mouse_click(pos, ui, sim):
     if not (sim_left <= sx < sim_right and 0 <= sy < WINDOW_HEIGHT):
         return
 
-    # Check if clicked on an object
-    for obj in sim.scene.objects:
-        dist = ((wx - obj.x)**2 + (wy - obj.y)**2)**0.5
-        if dist < obj.radius:
-            sim.panning = False
-            sim.dragging_object = obj
-            select_object(obj, ui, sim)
-            return
+    # Check if clicked on an object (the first one in store order wins)
+    bodies = sim.scene.objects
+    hits = np.flatnonzero((wx - bodies.x)**2 + (wy - bodies.y)**2 < bodies.radius**2)
+    if hits.size:
+        obj = bodies[int(hits[0])]
+        sim.panning = False
+        sim.dragging_object = obj
+        select_object(obj, ui, sim)
+        return
 
     # If no object was clicked, start panning
     deselect_object(ui, sim)
@@ -72,7 +84,12 @@ def handle_button_press(element, ui, sim):
         sim.paused = not sim.paused
         ui.pause_button.set_text("Resume" if sim.paused else "Pause")
     elif element == ui.reset_button:
+        if sim.recorder is not None:
+            stop_recording(ui, sim)
+        if sim.replay is not None:
+            end_replay(ui, sim)
         sim.scene.objects.clear()
+        sim.checkpoints.clear()
         sim.selected_object = None
         sim.scene.object_id_counter = 0
         sim.elapsed_time = 0
@@ -80,18 +97,248 @@ def handle_button_press(element, ui, sim):
         ui.ui_manager.switch_page("right", "main")
         set_input_defaults(ui, DEFAULT_INPUTS)
         refresh_object_list(ui, sim)
+    elif element == ui.rewind_button:
+        rewind(ui, sim)
+    elif element == ui.save_button:
+        save_scene(sim)
+    elif element == ui.load_button:
+        launch_load_dialog(ui)
+    elif element == ui.record_button:
+        if sim.replay is not None:
+            end_replay(ui, sim)
+        elif sim.recorder is not None:
+            stop_recording(ui, sim)
+        else:
+            start_recording(ui, sim)
     elif element == ui.toggle_trail_button:
         sim.scene.trail_enabled = not getattr(sim.scene, "trail_enabled", False)
         ui.toggle_trail_button.set_text("Show Trail" if not sim.scene.trail_enabled else "Hide Trail")
+    elif element == ui.trail_mode_button:
+        cycle_trail_mode(ui, sim)
     elif element == ui.toggle_velocity_vectors_button:
         sim.scene.vectors_enabled = not getattr(sim.scene, "vectors_enabled", True)
         text = "Show Velocity Vectors" if not sim.scene.vectors_enabled else "Hide Velocity Vectors"
         ui.toggle_velocity_vectors_button.set_text(text)
+    elif element == ui.toggle_field_button:
+        cycle_field_mode(ui, sim)
+    elif element == ui.force_engine_button:
+        cycle_force_engine(ui, sim)
+    elif element == ui.integrator_button:
+        cycle_integrator(ui, sim)
+    elif element == ui.lod_mode_button:
+        cycle_lod_mode(ui, sim)
+    elif element == ui.timings_button:
+        toggle_timing_overlay(sim, ui)
     elif element == ui.zoom_in_button:
         zoom_around_center(sim, True)
     elif element == ui.zoom_out_button:
         zoom_around_center(sim, False)
 
+def cycle_field_mode(ui, sim):
+    """Switch between the vector field, the heatmap and no field display."""
+    current = sim.scene.field_mode
+    next_mode = FIELD_MODES[(FIELD_MODES.index(current) + 1) % len(FIELD_MODES)] if current in FIELD_MODES else FIELD_MODES[0]
+    sim.scene.field_mode = next_mode
+    ui.toggle_field_button.set_text(f"Field: {FIELD_MODE_LABELS[next_mode]}")
+
+def cycle_trail_mode(ui, sim):
+    """Switch between redrawn polyline trails and the persistent fading trail image."""
+    renderer = sim.scene.trail_renderer
+    renderer.mode = TRAIL_MODES[(TRAIL_MODES.index(renderer.mode) + 1) % len(TRAIL_MODES)] if renderer.mode in TRAIL_MODES else TRAIL_MODES[0]
+    ui.trail_mode_button.set_text(f"Trails: {renderer.mode.capitalize()}")
+
+def cycle_lod_mode(ui, sim):
+    """Switch how bodies too small to see are drawn: additive splats, a density map, or full circles."""
+    current = sim.scene.lod_mode
+    sim.scene.lod_mode = SPLAT_MODES[(SPLAT_MODES.index(current) + 1) % len(SPLAT_MODES)] if current in SPLAT_MODES else SPLAT_MODES[0]
+    ui.lod_mode_button.set_text(f"Splats: {sim.scene.lod_mode.capitalize()}")
+
+def cycle_force_engine(ui, sim):
+    """Switch the scene to the next available gravity solver."""
+    names = list(FORCE_ENGINES)
+    current = sim.scene.force_engine.name
+    next_name = names[(names.index(current) + 1) % len(names)] if current in names else names[0]
+    sim.scene.set_force_engine(next_name)
+    ui.force_engine_button.set_text(f"Engine: {sim.scene.force_engine.label}")
+
+def cycle_integrator(ui, sim):
+    """Switch the scene to the next available integration scheme."""
+    names = list(INTEGRATORS)
+    current = sim.scene.integrator.name
+    next_name = names[(names.index(current) + 1) % len(names)] if current in names else names[0]
+    sim.scene.set_integrator(next_name)
+    ui.integrator_button.set_text(f"Integrator: {sim.scene.integrator.label}")
+
+def toggle_timing_overlay(sim, ui=None):
+    """Show or hide the frame timing overlay; timings are only collected while it is shown."""
+    profiler = sim.scene.profiler
+    profiler.enabled = not profiler.enabled
+    if not profiler.enabled:
+        profiler.reset()
+    if ui is not None:
+        ui.timings_button.set_text("Hide Timings" if profiler.enabled else "Show Timings")
+
+def dump_frame_timings(sim):
+    """Write the recorded frame timings to a timestamped CSV file in the working directory."""
+    profiler = sim.scene.profiler
+    if not profiler.frames_recorded:
+        print("No frame timings recorded; press F3 to start profiling.")
+        return
+    path = profiler.dump_csv(time.strftime("frame_timings_%Y%m%d_%H%M%S.csv"))
+    print(f"Frame timings written to {path}")
+
+def save_scene(sim):
+    """Write the current scene to a timestamped snapshot in SNAPSHOT_DIR."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = os.path.join(SNAPSHOT_DIR, time.strftime(f"scene_%Y%m%d_%H%M%S{SNAPSHOT_EXTENSION}"))
+    save_snapshot(path, sim.scene, sim.elapsed_time, speed_multiplier=sim.speed_multiplier)
+    print(f"Scene saved to {path}")
+
+def launch_load_dialog(ui):
+    ui.file_dialog = pygame_gui.windows.UIFileDialog(
+        rect=pygame.Rect((WINDOW_WIDTH//2 - 200, WINDOW_HEIGHT//2 - 200), (400, 400)),
+        manager=ui.manager,
+        window_title='Load Snapshot or Recording',
+        initial_file_path=SNAPSHOT_DIR if os.path.isdir(SNAPSHOT_DIR) else None,
+        allowed_suffixes={SNAPSHOT_EXTENSION, RECORDING_EXTENSION},
+        allow_existing_files_only=True,
+    )
+
+def load_scene(path, ui, sim):
+    """Replace the running scene with a snapshot saved by the GUI or the headless runner."""
+    if path.endswith(RECORDING_EXTENSION):
+        start_replay(path, ui, sim)
+        return
+    if sim.replay is not None:
+        end_replay(ui, sim)
+    try:
+        header = load_snapshot(path, sim.scene)
+    except (OSError, ValueError, KeyError) as error:
+        print(f"Could not load {path}: {error}")
+        return
+    sim.elapsed_time = header["elapsed_time"]
+    sim.checkpoints.clear()
+    speed_multiplier = header["settings"].get("speed_multiplier")
+    if speed_multiplier:
+        sim.speed_multiplier = speed_multiplier
+        ui.speed_multiplier_input.set_text(str(speed_multiplier))
+    refresh_settings_labels(ui, sim)
+    deselect_object(ui, sim)
+    print(f"Loaded {len(sim.scene.objects)} bodies from {path}")
+
+def start_recording(ui, sim):
+    """Start streaming the scene's trajectory to a timestamped file in RECORD_DIR."""
+    os.makedirs(RECORD_DIR, exist_ok=True)
+    path = os.path.join(RECORD_DIR, time.strftime(f"run_%Y%m%d_%H%M%S{RECORDING_EXTENSION}"))
+    sim.recorder = TrajectoryRecorder(path, sim.scene)
+    ui.record_button.set_text("Stop Rec")
+    print(f"Recording to {path}")
+
+def stop_recording(ui, sim):
+    recorder, sim.recorder = sim.recorder, None
+    ui.record_button.set_text("Record")
+    try:
+        recorder.close()
+    except RuntimeError as error:
+        print(error)
+        return
+    print(f"Recorded {recorder.frames_recorded} frames to {recorder.path}")
+
+def record_frame(ui, sim):
+    """Record the state after a physics step; adding or deleting bodies ends the recording."""
+    try:
+        sim.recorder.record(sim.scene, sim.elapsed_time)
+    except ValueError as error:
+        print(f"{error}; recording stopped.")
+        stop_recording(ui, sim)
+
+def start_replay(path, ui, sim):
+    """Show a recorded trajectory; the simulation stays stopped until the replay is ended."""
+    if sim.recorder is not None:
+        stop_recording(ui, sim)
+    try:
+        reader = TrajectoryReader(path)
+    except (OSError, ValueError, KeyError) as error:
+        print(f"Could not open {path}: {error}")
+        return
+    if reader.frame_count == 0:
+        print(f"{path} holds no frames")
+        return
+    if sim.replay is not None:
+        sim.replay.close()
+    sim.elapsed_time = reader.load_into(sim.scene)
+    sim.checkpoints.clear()
+    sim.replay = reader
+    sim.replay_index = 0
+    ui.record_button.set_text("End Replay")
+    ui.replay_slider.set_current_value(0)
+    deselect_object(ui, sim)
+    print(f"Replaying {reader.frame_count} frames of {reader.count} bodies from {path}")
+
+def show_replay_frame(ui, sim, index):
+    reader = sim.replay
+    if len(sim.scene.objects) != reader.count:
+        print("Bodies were added or removed; replay ended.")
+        end_replay(ui, sim)
+        return
+    index = min(max(index, 0), reader.frame_count - 1)
+    if index < sim.replay_index:
+        # Trails can't run backwards in time
+        sim.scene.trails.clear()
+    sim.replay_index = index
+    sim.elapsed_time = reader.show(sim.scene, index)
+    ui.replay_slider.set_current_value(round(100 * index / max(reader.frame_count - 1, 1)))
+
+def advance_replay(ui, sim, dt):
+    """Play the replay forward by dt simulated seconds, holding the last frame at the end."""
+    reader = sim.replay
+    target = min(sim.elapsed_time + dt, float(reader.times[-1]))
+    index = reader.index_at(target)
+    if index != sim.replay_index:
+        show_replay_frame(ui, sim, index)
+    if sim.replay is not None:
+        sim.elapsed_time = target
+
+def end_replay(ui, sim):
+    """Leave replay mode; the simulation carries on live from the frame shown."""
+    sim.replay.close()
+    sim.replay = None
+    ui.record_button.set_text("Record")
+
+def rewind(ui, sim):
+    """Go back REWIND_SECONDS of play: restore the nearest earlier checkpoint and re-run to the exact step."""
+    if sim.replay is not None:
+        return
+    if sim.recorder is not None:
+        # A recording can't go back in time
+        stop_recording(ui, sim)
+    history = sim.checkpoints
+    step, elapsed_time = history.rewind(sim.scene, history.step - REWIND_SECONDS * PHYSICS_HZ)
+    if elapsed_time is None:
+        return
+    sim.elapsed_time = elapsed_time
+    if sim.selected_object not in sim.scene.objects:
+        sim.selected_object = None
+    refresh_settings_labels(ui, sim)
+    if sim.selected_object is not None:
+        select_object(sim.selected_object, ui, sim)
+    else:
+        deselect_object(ui, sim)
+
+def refresh_settings_labels(ui, sim):
+    """Bring the settings buttons and sliders in line with the scene (after loading a snapshot)."""
+    scene = sim.scene
+    ui.toggle_field_button.set_text(f"Field: {FIELD_MODE_LABELS.get(scene.field_mode, scene.field_mode)}")
+    ui.force_engine_button.set_text(f"Engine: {scene.force_engine.label}")
+    ui.integrator_button.set_text(f"Integrator: {scene.integrator.label}")
+    ui.toggle_trail_button.set_text("Hide Trail" if scene.trail_enabled else "Show Trail")
+    ui.trail_mode_button.set_text(f"Trails: {scene.trail_renderer.mode.capitalize()}")
+    ui.toggle_velocity_vectors_button.set_text("Hide Velocity Vectors" if scene.vectors_enabled else "Show Velocity Vectors")
+    ui.lod_mode_button.set_text(f"Splats: {scene.lod_mode.capitalize()}")
+    ui.trail_length_slider.set_current_value(scene.trail_length)
+    ui.lod_threshold_slider.set_current_value(scene.lod_threshold)
+    ui.field_theta_slider.set_current_value(round(scene.field_theta * 10))
+
 def zoom_around_center(sim, zoom_direction):
     screen_center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
     sim.scene.camera.zoom_around_point(zoom_direction, screen_center)
@@ -118,15 +365,27 @@ def handle_dialog_button_press(element, ui, sim):
 def handle_slider_change(element, ui, sim):
     if element == getattr(ui, "trail_length_slider", None):
         sim.scene.trail_length = int(ui.trail_length_slider.get_current_value())
+    elif element == getattr(ui, "lod_threshold_slider", None):
+        sim.scene.lod_threshold = int(ui.lod_threshold_slider.get_current_value())
+    elif element == getattr(ui, "field_theta_slider", None):
+        sim.scene.field_theta = int(ui.field_theta_slider.get_current_value()) / 10
+    elif element == getattr(ui, "replay_slider", None) and sim.replay is not None:
+        fraction = ui.replay_slider.get_current_value() / 100
+        show_replay_frame(ui, sim, round(fraction * (sim.replay.frame_count - 1)))
+
+def object_label(body_id, names):
+    label = f"{body_id}"
+    if names.get(body_id):
+        label += f" ({names[body_id]})"
+    return label
 
 def handle_selection(label, ui, sim):
-    for obj in sim.scene.objects:
-        full_label = f"{obj.id}"
-        if hasattr(obj, "name") and obj.name:
-            full_label += f" ({obj.name})"
-        if full_label == label:
-            select_object(obj, ui, sim)
-            return
+    # Labels start with the body id; anything else (such as the "more" line) deselects
+    head = label.split(" ", 1)[0]
+    obj = sim.scene.objects.get(int(head)) if head.isdigit() else None
+    if obj is not None and object_label(obj.id, sim.scene.objects.names) == label:
+        select_object(obj, ui, sim)
+        return
     deselect_object(ui, sim)
 
 def select_object(obj, ui, sim):
@@ -185,21 +444,17 @@ def launch_confirm_delete_dialog(ui, sim):
     ui.confirm_dialog = dialog
 
 def refresh_object_list(ui, sim):
-    items = []
-    for obj in sim.scene.objects:
-        label = f"{obj.id}"
-        if hasattr(obj, "name") and obj.name:
-            label += f" ({obj.name})"
-        items.append(label)
-    ui.object_list.set_item_list(items)
+    # Labels come straight from the id column and the names, without a view per body
+    bodies = sim.scene.objects
+    shown = bodies.ids[:OBJECT_LIST_MAX_ITEMS].tolist()
     sel = sim.selected_object
-    if sel:
-        label = f"{sel.id}"
-        if hasattr(sel, "name") and sel.name:
-            label += f" ({sel.name})"
-        ui.object_list.selected_item = label
-    else:
-        ui.object_list.selected_item = None
+    if sel is not None and sel.id not in shown:
+        shown.append(sel.id)
+    items = [object_label(body_id, bodies.names) for body_id in shown]
+    if len(bodies) > len(shown):
+        items.append(f"... {len(bodies) - len(shown)} more")
+    ui.object_list.set_item_list(items)
+    ui.object_list.selected_item = object_label(sel.id, bodies.names) if sel is not None else None
 
 def add_object(ui, sim):
     """Add a new object with properties from UI and a unique ID."""
@@ -242,18 +497,18 @@ def add_object(ui, sim):
     wx, wy = camera.screen_to_world(screen_center_x, screen_center_y)
 
     shock_absorption = 0.001 * mass
-    obj = type('Object', (), {})()
-    obj.id = object_id_counter
-    obj.name = name
-    obj.x = wx
-    obj.y = wy
-    obj.vx = vx
-    obj.vy = vy
-    obj.mass = mass
-    obj.radius = radius
+    obj = sim.scene.objects.add(
+        object_id_counter,
+        x=wx,
+        y=wy,
+        vx=vx,
+        vy=vy,
+        mass=mass,
+        radius=radius,
+        color=(200, 50, 50),
+        name=name,
+    )
     obj.shock_absorption = shock_absorption
-    obj.color = (200, 50, 50)
-    sim.scene.objects.append(obj)
     sim.scene.object_id_counter += 1
     refresh_object_list(ui, sim)
     sim.selected_object = None
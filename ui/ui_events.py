@@ -34,6 +34,13 @@ def handle_event(event, ui, sim):
             zoom_around_center(sim, True)
         elif event.key == pygame.K_MINUS or event.key == pygame.K_KP_MINUS:
             zoom_around_center(sim, False)
+        elif event.key == pygame.K_F3:
+            toggle_timing_overlay(sim, ui)
+        elif event.key == pygame.K_F4:
+            dump_frame_timings(sim)
+        elif sim.replay is not None and event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+            # Step through a replay one recorded frame at a time
+            show_replay_frame(ui, sim, sim.replay_index + (1 if event.key == pygame.K_RIGHT else -1))
 
     elif event.type == pygame.USEREVENT:
         if event.user_type == pygame_gui.UI_TEXT_ENTRY_CHANGED:
@@ -57,6 +64,9 @@ def handle_event(event, ui, sim):
         elif event.user_type == pygame_gui.UI_BUTTON_PRESSED:
             handle_button_press(event.ui_element, ui, sim)
 
+        elif event.user_type == pygame_gui.UI_FILE_DIALOG_PATH_PICKED:
+            load_scene(event.text, ui, sim)
+
         elif event.user_type == pygame_gui.UI_SELECTION_LIST_NEW_SELECTION:
             handle_selection(event.text, ui, sim)
 
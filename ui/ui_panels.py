@@ -16,10 +16,18 @@ class RightPanel:
             ],
             "settings": [
                 {"type": "label", "text": "Settings", "name": "settings_label"},
-                {"type": "button", "text": "Toggle Field", "name": "toggle_field_button"},
+                {"type": "button", "text": "Field: Vector", "name": "toggle_field_button"},
+                {"type": "slider", "start_value": 7, "min_val": 1, "max_val": 15, "step": 1, "name": "field_theta_slider", "label": "Field θ (×0.1):"},
+                {"type": "button", "text": "Engine: Direct", "name": "force_engine_button"},
+                {"type": "button", "text": "Integrator: Euler", "name": "integrator_button"},
                 {"type": "slider", "start_value": 3, "min_val": 1, "max_val": 20, "step": 1, "name": "trail_length_slider", "label": "Trail Age (s):"},
                 {"type": "button", "text": "Hide Trail", "name": "toggle_trail_button"},
+                {"type": "button", "text": "Trails: Polyline", "name": "trail_mode_button"},
                 {"type": "button", "text": "Show Velocity Vectors", "name": "toggle_velocity_vectors_button"},
+                {"type": "button", "text": "Splats: Additive", "name": "lod_mode_button"},
+                {"type": "slider", "start_value": 2, "min_val": 1, "max_val": 10, "step": 1, "name": "lod_threshold_slider", "label": "Splat Below (px):"},
+                {"type": "slider", "start_value": 0, "min_val": 0, "max_val": 100, "step": 1, "name": "replay_slider", "label": "Replay (%):"},
+                {"type": "button", "text": "Show Timings", "name": "timings_button"},
                 {"type": "button", "text": "Return", "name": "return_button_settings"},
             ],
             "edit": [
@@ -47,6 +55,9 @@ class TopPanel:
         self.pages = {
             "main": [
                 {"type": "label", "text": "Gravity Simulator", "name": "title_label"},
+                {"type": "button", "text": "Record", "name": "record_button", "align": "right"},
+                {"type": "button", "text": "Save", "name": "save_button", "align": "right"},
+                {"type": "button", "text": "Load", "name": "load_button", "align": "right"},
                 {"type": "button", "text": "Help", "name": "help_button", "align": "right"},
             ]
         }
@@ -56,6 +67,7 @@ class BottomPanel:
         self.pages = {
             "main": [
                 {"type": "button", "text": "Pause", "name": "pause_button", "align": "center"},
+                {"type": "button", "text": "Rewind", "name": "rewind_button", "align": "center", "width": 100},
                 {"type": "button", "text": "Reset", "name": "reset_button", "align": "center"},
                 {"type": "text_input", "name": "speed_multiplier_input", "label": "Speed Multiplier:", "align": "right"},
                 {"type": "text_box", "text": "<p align='left'>FPS: 0 | Time: 0.0s</p>", "name": "status_label", "align": "left", "width": 400, "text_alignment": "left"},